@@ -0,0 +1,265 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+import pymupdf
+
+from chat.model.BucketedEmbeddings import BucketedEmbeddings
+from chat.model.MyDocumentThread import DocumentFactory, VectorStoreFactory
+from util.Constants import Constants, UI
+from util.EmbeddingModelPool import EmbeddingModelPool
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class IngestionBenchmark:
+    """
+    Runs load, split, embed and index over a corpus for every embedding model, vector store and chunk size,
+    and reports per-stage wall time, throughput, peak RSS and index size as JSON.
+    Each configuration runs in its own process, so peak RSS and loaded models do not leak between runs.
+
+    python -m benchmark.IngestionBenchmark --files 20 --types txt pdf docx --output benchmark.json
+    """
+
+    def __init__(self, file_paths, embedding_models, vector_stores, chunk_sizes, chunk_overlap, device):
+        self.file_paths = file_paths
+        self.embedding_models = embedding_models
+        self.vector_stores = vector_stores
+        self.chunk_sizes = chunk_sizes
+        self.chunk_overlap = chunk_overlap
+        self.device = device
+
+    def run(self):
+        results = []
+        for embedding_model in self.embedding_models:
+            for vector_store in self.vector_stores:
+                for chunk_size in self.chunk_sizes:
+                    config = {
+                        'embedding_model': embedding_model,
+                        'vector_store': vector_store,
+                        'chunk_size': chunk_size,
+                        'chunk_overlap': min(self.chunk_overlap, chunk_size // 2),
+                        'device': self.device,
+                    }
+                    print(f"{Constants.BENCHMARK_RUNNING} {config}", file=sys.stderr)
+                    results.append(self.run_isolated(config))
+        return {
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'device': self.device,
+            },
+            'corpus': {
+                'files': len(self.file_paths),
+                'bytes': sum(os.path.getsize(file_path) for file_path in self.file_paths),
+                'types': sorted({os.path.splitext(file_path)[1] for file_path in self.file_paths}),
+            },
+            'results': results,
+        }
+
+    def run_isolated(self, config):
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=IngestionBenchmark.run_config,
+                                          args=(self.file_paths, config, result_queue))
+        process.start()
+        result = None
+        while result is None:
+            try:
+                result = result_queue.get(timeout=Constants.BENCHMARK_POLL_INTERVAL)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                # A child killed by the OS or a native crash never reports, a result it put just before exiting
+                # is still in the pipe
+                try:
+                    result = result_queue.get(timeout=Constants.BENCHMARK_POLL_INTERVAL)
+                except queue.Empty:
+                    result = dict(config, error=f"{Constants.BENCHMARK_PROCESS_EXITED} {process.exitcode}")
+        process.join()
+        return result
+
+    @staticmethod
+    def run_config(file_paths, config, result_queue):
+        # Runs inside its own process
+        result = dict(config)
+        stages = {}
+        index_dir = tempfile.mkdtemp(prefix=Constants.BENCHMARK_TEMP_PREFIX)
+        try:
+            start_time = time.perf_counter()
+            documents = []
+            for file_path in file_paths:
+                documents.extend(DocumentFactory.create_document_loader(file_path).load())
+            stages['load'] = IngestionBenchmark.get_stage(start_time, len(documents), 'pages')
+
+            start_time = time.perf_counter()
+            text_splitter = DocumentFactory.create_text_splitter(config['chunk_size'], config['chunk_overlap'])
+            doc_splits = text_splitter.split_documents(documents)
+            stages['split'] = IngestionBenchmark.get_stage(start_time, len(doc_splits), 'chunks')
+
+            start_time = time.perf_counter()
+            embedding = EmbeddingModelPool.get_embeddings(config['embedding_model'], config['device'])
+            stages['model_load'] = {'seconds': time.perf_counter() - start_time}
+
+            start_time = time.perf_counter()
+            vectors = BucketedEmbeddings(embedding).embed_documents([doc.page_content for doc in doc_splits])
+            stages['embed'] = IngestionBenchmark.get_stage(start_time, len(doc_splits), 'chunks')
+
+            start_time = time.perf_counter()
+            store = VectorStoreFactory.create_vector_store(config['vector_store'], doc_splits, embedding,
+                                                           vectors=vectors, folder_path=index_dir)
+            VectorStoreFactory.build_ann_index(config['vector_store'], store)
+            VectorStoreFactory.save_vector_store(config['vector_store'], store, index_dir)
+            stages['index'] = IngestionBenchmark.get_stage(start_time, len(doc_splits), 'chunks')
+
+            result['stages'] = stages
+            result['total_seconds'] = sum(stage['seconds'] for stage in stages.values())
+            result['index_size_bytes'] = IngestionBenchmark.get_folder_size(index_dir)
+            result['peak_rss_bytes'] = IngestionBenchmark.get_peak_rss()
+        except Exception as e:
+            result['stages'] = stages
+            result['error'] = str(e)
+        finally:
+            shutil.rmtree(index_dir, ignore_errors=True)
+        result_queue.put(result)
+
+    @staticmethod
+    def get_stage(start_time, count, unit):
+        seconds = time.perf_counter() - start_time
+        return {
+            'seconds': seconds,
+            unit: count,
+            f'{unit}_per_sec': count / seconds if seconds > 0 else None,
+        }
+
+    @staticmethod
+    def get_folder_size(folder_path):
+        return sum(os.path.getsize(os.path.join(root, file))
+                   for root, _, files in os.walk(folder_path) for file in files)
+
+    @staticmethod
+    def get_peak_rss():
+        if resource is None:
+            return None
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+class SyntheticCorpus:
+    """
+    Deterministic synthetic documents (.txt, .pdf, .docx) with a Zipf-like word distribution.
+    """
+
+    def __init__(self, folder_path, seed=Constants.BENCHMARK_SEED):
+        self.folder_path = folder_path
+        self.random = random.Random(seed)
+        self.vocabulary = [f"term{i}" for i in range(Constants.BENCHMARK_VOCABULARY_SIZE)]
+        self.weights = [1 / (rank + 1) for rank in range(len(self.vocabulary))]
+
+    def create_paragraphs(self, word_count):
+        words = self.random.choices(self.vocabulary, weights=self.weights, k=word_count)
+        size = Constants.BENCHMARK_WORDS_PER_PARAGRAPH
+        return [' '.join(words[i:i + size]) + '.' for i in range(0, word_count, size)]
+
+    def create(self, file_count, words_per_file, file_types):
+        os.makedirs(self.folder_path, exist_ok=True)
+        file_paths = []
+        for i in range(file_count):
+            file_type = file_types[i % len(file_types)]
+            file_path = os.path.join(self.folder_path, f"document_{i}.{file_type}")
+            paragraphs = self.create_paragraphs(words_per_file)
+            if file_type == 'txt':
+                with open(file_path, 'w', encoding=UI.UTF_8) as file:
+                    file.write('\n\n'.join(paragraphs))
+            elif file_type == 'pdf':
+                self.write_pdf(file_path, paragraphs)
+            elif file_type == 'docx':
+                self.write_docx(file_path, paragraphs)
+            else:
+                raise ValueError(UI.UNSUPPORTED_FILE_TYPE)
+            file_paths.append(file_path)
+        return file_paths
+
+    @staticmethod
+    def write_pdf(file_path, paragraphs):
+        pdf = pymupdf.open()
+        per_page = Constants.BENCHMARK_PARAGRAPHS_PER_PAGE
+        for i in range(0, len(paragraphs), per_page):
+            page = pdf.new_page()
+            page.insert_textbox(page.rect + (36, 36, -36, -36), '\n'.join(paragraphs[i:i + per_page]), fontsize=8)
+        pdf.save(file_path)
+        pdf.close()
+
+    @staticmethod
+    def write_docx(file_path, paragraphs):
+        # The smallest package docx2txt reads: content types, package relationship and the document part
+        body = ''.join(f"<w:p><w:r><w:t>{escape(paragraph)}</w:t></w:r></w:p>" for paragraph in paragraphs)
+        with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as docx:
+            docx.writestr('[Content_Types].xml', Constants.BENCHMARK_DOCX_CONTENT_TYPES)
+            docx.writestr('_rels/.rels', Constants.BENCHMARK_DOCX_RELATIONSHIPS)
+            docx.writestr('word/document.xml', Constants.BENCHMARK_DOCX_DOCUMENT.format(body=body))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Document ingestion benchmark")
+    parser.add_argument('--corpus', nargs='*', default=None,
+                        help="Files or folders to ingest instead of a synthetic corpus")
+    parser.add_argument('--files', type=int, default=Constants.BENCHMARK_FILES)
+    parser.add_argument('--words-per-file', type=int, default=Constants.BENCHMARK_WORDS_PER_FILE)
+    parser.add_argument('--types', nargs='+', default=Constants.BENCHMARK_FILE_TYPES, choices=['txt', 'pdf', 'docx'])
+    parser.add_argument('--embedding-models', nargs='+', default=Constants.EMBEDDING_LIST)
+    parser.add_argument('--vector-stores', nargs='+', default=Constants.BENCHMARK_VECTOR_STORES)
+    parser.add_argument('--chunk-sizes', nargs='+', type=int, default=Constants.BENCHMARK_CHUNK_SIZES)
+    parser.add_argument('--chunk-overlap', type=int, default=Constants.BENCHMARK_CHUNK_OVERLAP)
+    parser.add_argument('--device', default="auto")
+    parser.add_argument('--output', default=None, help="JSON output file, stdout when omitted")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    device = arguments.device
+    if device == "auto":
+        # Imported here, torch is only needed to pick the device
+        from util.Utility import Utility
+        device = Utility.get_torch_device()
+
+    corpus_dir = None
+    if arguments.corpus:
+        file_paths = DocumentFactory.expand_file_paths(arguments.corpus)
+    else:
+        corpus_dir = tempfile.mkdtemp(prefix=Constants.BENCHMARK_TEMP_PREFIX)
+        file_paths = SyntheticCorpus(corpus_dir).create(arguments.files, arguments.words_per_file, arguments.types)
+
+    try:
+        report = IngestionBenchmark(file_paths, arguments.embedding_models, arguments.vector_stores,
+                                    arguments.chunk_sizes, arguments.chunk_overlap, device).run()
+    finally:
+        if corpus_dir is not None:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding=UI.UTF_8) as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
@@ -42,6 +42,9 @@ class ChatPresenter(QWidget):
                                                                       default="LANGCHAIN_ENDPOINT", save=True)
         os.environ["LANGCHAIN_PROJECT"] = Utility.get_settings_value(section="Langchain", prop="langchain_project",
                                                                      default="LANGCHAIN_PROJECT", save=True)
+        # "Local" answers web searches from a local file, for running without a Tavily key
+        self.web_search_backend = Utility.get_settings_value(section="Langchain", prop="web_search_backend",
+                                                             default=Constants.WEB_SEARCH_BACKEND, save=True)
 
     def initialize_manager(self):
         self._settings = SettingsManager.get_settings()
@@ -62,6 +65,8 @@ class ChatPresenter(QWidget):
         self.workflowModel.thread_finished_signal.connect(self.chatView.finish_chat)
         self.workflowModel.response_signal.connect(self.handle_response_signal)
         self.workflowModel.response_finished_signal.connect(self.handle_response_finished_signal)
+        self.workflowModel.generation_started_signal.connect(self.chatView.start_stream)
+        self.workflowModel.token_signal.connect(self.chatView.append_stream)
 
         # View signal
         self.chatView.submitted_file_signal.connect(self.document_preprocessing)
@@ -81,8 +86,11 @@ class ChatPresenter(QWidget):
 
         # Document Model
         self.documentModel = MyDocumentModel()
+        self.documentModel.thread_started_signal.connect(self.chatView.start_document)
+        self.documentModel.thread_finished_signal.connect(self.chatView.finish_document)
         self.documentModel.document_preprocess_finished_signal.connect(self.handle_document_preprocess_finished_signal)
         self.documentModel.retriever_signal.connect(self.handle_retriever_signal)
+        self.chatView.stop_signal.connect(self.documentModel.force_stop)
 
         # View
         main_layout = QVBoxLayout()
@@ -102,6 +110,7 @@ class ChatPresenter(QWidget):
     def handle_response_signal(self, image_data, response_text):
         if response_text.lower() == 'error':
             # The possible values for image_data here, 'max_retries reached or not supported'.
+            self.chatView.retract_stream()
             QMessageBox.information(self, image_data,
                                     LANGCHAIN_CONSTANT.UNABLE_TO_FIND_AN_ANSWER)
             self.chatView.stop_widget.setVisible(False)
@@ -203,6 +212,10 @@ class ChatPresenter(QWidget):
     # Langchain
     @pyqtSlot(str, str, float)
     def handle_document_preprocess_finished_signal(self, model, finish_reason, elapsed_time):
+        if finish_reason == Constants.FORCE_STOP:
+            QMessageBox.information(self, LANGCHAIN_CONSTANT.DOCUMENT_PROCESS_STOPPED,
+                                    LANGCHAIN_CONSTANT.DOCUMENT_PROCESS_RESUME)
+            return
         self.langchain_rag_ready = True
         QMessageBox.information(self, LANGCHAIN_CONSTANT.DOCUMENT_PROCESS_FINISHED,
                                 LANGCHAIN_CONSTANT.ENTER_YOUR_PROMPT)
@@ -215,6 +228,14 @@ class ChatPresenter(QWidget):
         self.workflowModel.llm_name = self.chatView.get_llm_name()
         self.workflowModel.max_retries = self.chatView.get_max_retries()
         self.workflowModel.search_result = self.chatView.get_search_result()
+        self.workflowModel.batch_grading = self.chatView.get_batch_grading()
+        self.workflowModel.fast_router = self.chatView.get_fast_router()
+        self.workflowModel.fast_router_margin = self.chatView.get_fast_router_margin()
+        self.workflowModel.score_gating = self.chatView.get_score_gating()
+        self.workflowModel.score_gating_accept = self.chatView.get_score_gating_accept()
+        self.workflowModel.score_gating_reject = self.chatView.get_score_gating_reject()
+        self.workflowModel.answer_cache_threshold = self.chatView.get_answer_cache_threshold()
+        self.workflowModel.web_search_backend = self.web_search_backend
 
     @pyqtSlot(object)
     def document_preprocessing(self, args):
@@ -0,0 +1,111 @@
+import json
+import math
+import os
+import re
+from array import array
+
+import numpy as np
+
+from util.Constants import Constants, UI
+
+
+class BM25Index:
+    """
+    Lexical BM25 index over the chunks of a vector store, rows follow the order the chunks were added in.
+    Postings are stored on disk as flat numpy arrays (uint32 row ids, uint16 term frequencies) and memory mapped on load.
+    """
+    TOKEN_PATTERN = re.compile(r"\w+(?:[-./:]\w+)*")
+    TOKEN_SEPARATOR = re.compile(r"[-./:]")
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_lengths = array('I')
+        self.terms = None
+        self.offsets = None
+        self.doc_ids = None
+        self.term_freqs = None
+        self.average_length = 0.0
+
+    @staticmethod
+    def tokenize(text):
+        tokens = []
+        for token in BM25Index.TOKEN_PATTERN.findall(text.lower()):
+            tokens.append(token)
+            # Part numbers and error codes match as a whole and by their parts
+            parts = BM25Index.TOKEN_SEPARATOR.split(token)
+            if len(parts) > 1:
+                tokens.extend(parts)
+        return tokens
+
+    def add_documents(self, texts):
+        for text in texts:
+            row = len(self.doc_lengths)
+            tokens = self.tokenize(text)
+            self.doc_lengths.append(len(tokens))
+            term_counts = {}
+            for token in tokens:
+                term_counts[token] = term_counts.get(token, 0) + 1
+            for term, count in term_counts.items():
+                rows, counts = self.postings.setdefault(term, (array('I'), array('H')))
+                rows.append(row)
+                counts.append(min(count, 0xFFFF))
+
+    def save(self, folder_path):
+        terms = sorted(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(self.postings[term][0])
+        doc_ids = np.empty(offsets[-1], dtype=np.uint32)
+        term_freqs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            rows, counts = self.postings[term]
+            doc_ids[offsets[i]:offsets[i + 1]] = rows
+            term_freqs[offsets[i]:offsets[i + 1]] = counts
+
+        with open(os.path.join(folder_path, Constants.BM25_TERMS_FILE), 'w', encoding=UI.UTF_8) as file:
+            json.dump(terms, file)
+        np.save(os.path.join(folder_path, Constants.BM25_OFFSETS_FILE), offsets)
+        np.save(os.path.join(folder_path, Constants.BM25_DOC_IDS_FILE), doc_ids)
+        np.save(os.path.join(folder_path, Constants.BM25_TERM_FREQS_FILE), term_freqs)
+        np.save(os.path.join(folder_path, Constants.BM25_DOC_LENGTHS_FILE), np.asarray(self.doc_lengths, dtype=np.uint32))
+
+    @staticmethod
+    def exists(folder_path):
+        return os.path.isfile(os.path.join(folder_path, Constants.BM25_DOC_LENGTHS_FILE))
+
+    @classmethod
+    def load(cls, folder_path, mmap=True):
+        mmap_mode = 'r' if mmap else None
+        index = cls()
+        with open(os.path.join(folder_path, Constants.BM25_TERMS_FILE), 'r', encoding=UI.UTF_8) as file:
+            index.terms = {term: i for i, term in enumerate(json.load(file))}
+        index.offsets = np.load(os.path.join(folder_path, Constants.BM25_OFFSETS_FILE), mmap_mode=mmap_mode)
+        index.doc_ids = np.load(os.path.join(folder_path, Constants.BM25_DOC_IDS_FILE), mmap_mode=mmap_mode)
+        index.term_freqs = np.load(os.path.join(folder_path, Constants.BM25_TERM_FREQS_FILE), mmap_mode=mmap_mode)
+        index.doc_lengths = np.load(os.path.join(folder_path, Constants.BM25_DOC_LENGTHS_FILE), mmap_mode=mmap_mode)
+        index.average_length = float(np.mean(index.doc_lengths)) if len(index.doc_lengths) else 0.0
+        return index
+
+    def search(self, query, k):
+        doc_count = len(self.doc_lengths)
+        if doc_count == 0:
+            return []
+
+        scores = np.zeros(doc_count, dtype=np.float32)
+        for term in set(self.tokenize(query)):
+            i = self.terms.get(term)
+            if i is None:
+                continue
+            start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+            rows = np.asarray(self.doc_ids[start:end])
+            term_freqs = np.asarray(self.term_freqs[start:end], dtype=np.float32)
+            document_frequency = end - start
+            idf = math.log(1 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            length_norm = 1 - Constants.BM25_B + Constants.BM25_B * np.asarray(self.doc_lengths[rows]) / self.average_length
+            scores[rows] += idf * term_freqs * (Constants.BM25_K1 + 1) / (term_freqs + Constants.BM25_K1 * length_norm)
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [(int(row), float(scores[row])) for row in matched]
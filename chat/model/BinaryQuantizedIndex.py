@@ -0,0 +1,94 @@
+import os
+
+import faiss
+import numpy as np
+
+from util.Constants import Constants
+
+
+class BinaryQuantizedIndex:
+    """
+    Binary quantized index with float re-scoring, usable as the index of a FAISS vector store.
+    Candidates are found by Hamming distance on the sign bits, then re-scored by L2 distance on the float vectors.
+    Sign bits are taken after subtracting the per dimension mean of the indexed vectors, so each bit splits the corpus.
+    Once loaded only the sign bits stay in memory, the float vectors are memory mapped from disk.
+    The float vectors are the index cache entry's chunk_vectors.npy, the incremental re-index reads the same file.
+    """
+
+    def __init__(self, d, binary_index=None, vectors=None, mean=None,
+                 rescore_factor=Constants.QUANTIZED_RESCORE_FACTOR):
+        self.d = d
+        # Entries saved before centering have no mean, their sign bits are taken around zero
+        self.mean = np.zeros(d, dtype=np.float32) if mean is None else np.asarray(mean, dtype=np.float32)
+        self.rescore_factor = rescore_factor
+        # Sign bits are packed into bytes, so the binary index works on a multiple of 8 bits
+        self.binary_index = binary_index or faiss.IndexBinaryFlat(((d + 7) // 8) * 8)
+        self.vectors = vectors
+        self.pending_vectors = []
+
+    @property
+    def ntotal(self):
+        return self.binary_index.ntotal
+
+    @property
+    def code_size(self):
+        return self.binary_index.code_size
+
+    def encode(self, x):
+        return np.packbits(x > self.mean, axis=1)
+
+    def add(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        self.binary_index.add(self.encode(x))
+        self.pending_vectors.append(x)
+
+    def get_vectors(self):
+        if self.pending_vectors:
+            parts = [self.vectors] if self.vectors is not None else []
+            self.vectors = np.concatenate(parts + self.pending_vectors)
+            self.pending_vectors = []
+        if self.vectors is None:
+            return np.empty((0, self.d), dtype=np.float32)
+        return self.vectors
+
+    def search(self, x, k):
+        x = np.asarray(x, dtype=np.float32)
+        distances = np.full((len(x), k), np.inf, dtype=np.float32)
+        labels = np.full((len(x), k), -1, dtype=np.int64)
+        if self.ntotal == 0:
+            return distances, labels
+
+        candidate_count = min(k * self.rescore_factor, self.ntotal)
+        _, candidates = self.binary_index.search(self.encode(x), candidate_count)
+        vectors = self.get_vectors()
+        for i, query in enumerate(x):
+            # Sorted row ids keep the reads of a memory mapped file sequential
+            rows = np.sort(candidates[i][candidates[i] >= 0])
+            row_distances = ((np.asarray(vectors[rows]) - query) ** 2).sum(axis=1)
+            best = np.argsort(row_distances)[:k]
+            distances[i, :len(best)] = row_distances[best]
+            labels[i, :len(best)] = rows[best]
+        return distances, labels
+
+    def reconstruct(self, i):
+        return np.asarray(self.get_vectors()[i], dtype=np.float32)
+
+    def get_memory_size(self):
+        return self.ntotal * self.code_size
+
+    def write(self, folder_path):
+        faiss.write_index_binary(self.binary_index, os.path.join(folder_path, Constants.BINARY_INDEX_FILE))
+        np.save(os.path.join(folder_path, Constants.INDEX_CACHE_CHUNK_VECTORS), self.get_vectors())
+        np.save(os.path.join(folder_path, Constants.BINARY_INDEX_MEAN), self.mean)
+
+    @classmethod
+    def read(cls, folder_path, io_flags=0):
+        binary_index = faiss.read_index_binary(os.path.join(folder_path, Constants.BINARY_INDEX_FILE), io_flags)
+        # Older entries have their own vectors next to a chunk_vectors.npy in a different row order
+        vectors_path = os.path.join(folder_path, Constants.BINARY_INDEX_VECTORS)
+        if not os.path.isfile(vectors_path):
+            vectors_path = os.path.join(folder_path, Constants.INDEX_CACHE_CHUNK_VECTORS)
+        vectors = np.load(vectors_path, mmap_mode='r')
+        mean_path = os.path.join(folder_path, Constants.BINARY_INDEX_MEAN)
+        mean = np.load(mean_path) if os.path.isfile(mean_path) else None
+        return cls(vectors.shape[1], binary_index=binary_index, vectors=vectors, mean=mean)
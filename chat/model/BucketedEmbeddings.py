@@ -0,0 +1,105 @@
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from chat.model.IngestionStopped import IngestionStopped
+from util.Constants import Constants, FILE_INDEX_MESSAGE
+
+
+class BucketedEmbeddings(Embeddings):
+    """
+    Embeds documents in batches of similar token length, so short chunks are not padded up to the longest one.
+    Batches are sized by a token budget that is tuned on the fly for each model, unless a fixed batch size is given.
+    The returned vectors keep the order of the input texts.
+    should_stop is checked before every batch, IngestionStopped is raised once it returns True.
+    """
+    __tuned_token_budgets = {}
+    __lock = threading.Lock()
+
+    def __init__(self, embedding, batch_size=0, should_stop=None):
+        self.embedding = embedding
+        self.batch_size = batch_size
+        self.should_stop = should_stop
+        self.model_key = (getattr(embedding, 'model_name', type(embedding).__name__),
+                          str(getattr(embedding, 'model_kwargs', {}).get('device')))
+        with BucketedEmbeddings.__lock:
+            tuned_budget = BucketedEmbeddings.__tuned_token_budgets.get(self.model_key)
+        self.tuned = tuned_budget is not None
+        self.token_budget = tuned_budget or Constants.EMBEDDING_TOKEN_BUDGET_START
+        self.best_token_budget = self.token_budget
+        self.best_throughput = 0.0
+        self.embedded_chunks = 0
+        self.embedding_time = 0.0
+
+    def embed_documents(self, texts):
+        lengths = self.count_tokens(texts)
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        vectors = [None] * len(texts)
+
+        start = 0
+        while start < len(order):
+            if self.should_stop is not None and self.should_stop():
+                raise IngestionStopped()
+            end = self.get_batch_end(order, lengths, start)
+            batch = order[start:end]
+
+            start_time = time.time()
+            batch_vectors = self.embedding.embed_documents([texts[i] for i in batch])
+            elapsed_time = time.time() - start_time
+
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+            # Padded tokens processed, the longest chunk of a sorted batch is its last one
+            self.tune(len(batch) * lengths[batch[-1]], elapsed_time)
+            self.embedded_chunks += len(batch)
+            self.embedding_time += elapsed_time
+            start = end
+        return vectors
+
+    def embed_query(self, text):
+        return self.embedding.embed_query(text)
+
+    def get_batch_end(self, order, lengths, start):
+        if self.batch_size > 0:
+            return min(start + self.batch_size, len(order))
+
+        end = start + 1
+        while (end < len(order) and end - start < Constants.EMBEDDING_MAX_BATCH_SIZE
+               and (end - start + 1) * lengths[order[end]] <= self.token_budget):
+            end += 1
+        return end
+
+    def tune(self, padded_tokens, elapsed_time):
+        if self.tuned or self.batch_size > 0 or elapsed_time <= 0:
+            return
+
+        # Grow the budget while throughput keeps improving and a batch stays short enough to react to a stop
+        throughput = padded_tokens / elapsed_time
+        if throughput > self.best_throughput * Constants.EMBEDDING_TUNE_MIN_GAIN:
+            self.best_throughput = throughput
+            self.best_token_budget = self.token_budget
+            if (elapsed_time < Constants.EMBEDDING_MAX_BATCH_SECONDS
+                    and self.token_budget < Constants.EMBEDDING_TOKEN_BUDGET_MAX):
+                self.token_budget = min(self.token_budget * 2, Constants.EMBEDDING_TOKEN_BUDGET_MAX)
+                return
+        self.token_budget = self.best_token_budget
+        self.tuned = True
+        with BucketedEmbeddings.__lock:
+            BucketedEmbeddings.__tuned_token_budgets[self.model_key] = self.token_budget
+        print(f"{FILE_INDEX_MESSAGE.EMBEDDING_BATCH_TUNED} {self.model_key[0]} {self.token_budget} tokens")
+
+    def count_tokens(self, texts):
+        client = getattr(self.embedding, '_client', None)
+        tokenizer = getattr(client, 'tokenizer', None)
+        if tokenizer is None:
+            return [len(text) // Constants.EMBEDDING_CHARS_PER_TOKEN + 1 for text in texts]
+
+        max_length = getattr(client, 'max_seq_length', None) or Constants.EMBEDDING_TOKEN_BUDGET_MAX
+        input_ids = tokenizer(texts, add_special_tokens=True, truncation=False)['input_ids']
+        return [min(len(ids), max_length) for ids in input_ids]
+
+    def get_throughput(self):
+        if self.embedding_time <= 0:
+            return 0.0
+        return self.embedded_chunks / self.embedding_time
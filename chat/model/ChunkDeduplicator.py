@@ -0,0 +1,73 @@
+import re
+import zlib
+
+import numpy as np
+
+from util.Constants import Constants
+
+
+class ChunkDeduplicator:
+    """
+    Drops near-duplicate chunks before they are embedded, using MinHash signatures over word shingles
+    and LSH banding to find candidates. A chunk is collapsed into an earlier one when their estimated
+    Jaccard similarity reaches the threshold. State is kept across batches, so streaming works the same way.
+    The source and page of a dropped chunk are added to the duplicate_sources metadata of the chunk it collapsed into.
+    """
+    WORD_PATTERN = re.compile(r"\w+")
+    HASH_MASK = np.uint64(0xFFFFFFFF)
+
+    def __init__(self, threshold, num_perm=Constants.DEDUP_NUM_PERM, shingle_size=Constants.DEDUP_SHINGLE_SIZE):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(Constants.DEDUP_SEED)
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.bands, self.rows = self.get_band_layout(num_perm, threshold)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.signatures = []
+        # duplicate_sources list of each kept chunk, filled in place, so a chunk already in the store sees it too
+        self.duplicate_sources = []
+        self.collapsed = 0
+
+    @staticmethod
+    def get_band_layout(num_perm, threshold):
+        # The band count whose S-curve midpoint (1/b)^(1/r) is closest to the threshold
+        layouts = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+        return min(layouts, key=lambda layout: abs((1 / layout[0]) ** (1 / layout[1]) - threshold))
+
+    def get_signature(self, text):
+        words = self.WORD_PATTERN.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            shingles = {' '.join(words)}
+        else:
+            shingles = {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+        # crc32 keeps signatures stable across processes, so the kept chunks do not change between runs
+        hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64,
+                             count=len(shingles))
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) & self.HASH_MASK).min(axis=1)
+
+    def find_duplicate(self, signature, band_keys):
+        for band, key in enumerate(band_keys):
+            for candidate in self.buckets[band].get(key, ()):
+                if np.mean(self.signatures[candidate] == signature) >= self.threshold:
+                    return candidate
+        return None
+
+    def filter(self, doc_splits):
+        kept = []
+        for doc in doc_splits:
+            signature = self.get_signature(doc.page_content)
+            band_keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+            duplicate = self.find_duplicate(signature, band_keys)
+            if duplicate is not None:
+                self.duplicate_sources[duplicate].append(
+                    {key: doc.metadata[key] for key in Constants.DEDUP_SOURCE_KEYS if key in doc.metadata})
+                self.collapsed += 1
+                continue
+            for band, key in enumerate(band_keys):
+                self.buckets[band].setdefault(key, []).append(len(self.signatures))
+            self.signatures.append(signature)
+            doc.metadata['duplicate_sources'] = []
+            self.duplicate_sources.append(doc.metadata['duplicate_sources'])
+            kept.append(doc)
+        return kept
@@ -0,0 +1,32 @@
+from chat.model.IndexCalibration import IndexCalibration
+from util.Constants import Constants
+
+
+class FastRouter:
+    """
+    Routes a question by its top-1 distance in the vector store instead of an LLM call.
+    The distance is compared with the calibration of the index, a question clearly closer to the documents than
+    the web search exemplars goes to the vectorstore, one as far from them and from the topic of the whole index
+    goes to web search. Returns None in between, the LLM router decides then.
+    """
+
+    def __init__(self, store, calibration: IndexCalibration, margin=Constants.FAST_ROUTER_MARGIN):
+        self.store = store
+        self.calibration = calibration
+        self.margin = margin
+
+    def route(self, question_vector):
+        # Returns ('vectorstore' | 'websearch' | None, scores)
+        # One nearest neighbour search on the index already built, ANN indexes answer it in sub-linear time
+        distance = self.calibration.get_relative_distance(
+            IndexCalibration.get_top_distance(self.store, question_vector))
+        centroid_score = self.calibration.get_centroid_score(question_vector)
+        scores = {
+            'distance': distance,
+            'centroid': centroid_score,
+        }
+        if distance <= 1.0 - self.margin:
+            return 'vectorstore', scores
+        if distance >= 1.0 and centroid_score <= self.calibration.reference_centroid_score:
+            return 'websearch', scores
+        return None, scores
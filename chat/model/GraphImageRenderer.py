@@ -0,0 +1,225 @@
+import io
+import math
+
+from PIL import Image, ImageDraw, ImageFont
+
+from util.Constants import Constants
+from util.Utility import Utility
+
+
+class GraphImageRenderer:
+    """
+    Draws a compiled LangGraph locally with PIL, nodes in layers from the start node and conditional edges dashed.
+    Every condition gets its own labelled edge, edges between the same two nodes are drawn side by side.
+    The base image is rendered once per graph, the image with the path of a run highlighted is cached per path.
+    A path edge is (source, target, condition), so only the condition the run took is highlighted.
+    Images are returned base64 encoded, the way ImageWidget takes them.
+    """
+
+    def __init__(self, graph):
+        drawable = graph.get_graph()
+        self.node_ids = list(drawable.nodes)
+        self.edges = self.get_edges(graph, drawable)
+        self.font = self.get_font()
+        self.positions = self.get_layout()
+        self.cache = {}
+
+    @staticmethod
+    def get_edges(graph, drawable):
+        # get_graph keeps one edge per target, so conditions that lead to the same node lose all but one label.
+        # The conditions are taken from the branches of the builder instead.
+        # An edge is (source, target, label, conditional, condition), condition is None when it is not known
+        branches = getattr(getattr(graph, 'builder', None), 'branches', {})
+        edges = []
+        for edge in drawable.edges:
+            labels = []
+            if edge.conditional:
+                for branch in branches.get(edge.source, {}).values():
+                    labels.extend(label for label, target in (branch.ends or {}).items() if target == edge.target)
+            if not labels:
+                edges.append((edge.source, edge.target, edge.data, edge.conditional, None))
+                continue
+            for label in labels:
+                # Same as get_graph, a condition named after its target is not labelled
+                edges.append((edge.source, edge.target, label if label != edge.target else None, True, label))
+        return edges
+
+    @staticmethod
+    def get_font():
+        try:
+            return ImageFont.load_default(size=Constants.GRAPH_IMAGE_FONT_SIZE)
+        except TypeError:
+            # Pillow before 10.1 has a single bitmap size
+            return ImageFont.load_default()
+
+    def get_layout(self):
+        # Layer of a node is its distance from the start node
+        layers = {self.node_ids[0]: 0}
+        queue = [self.node_ids[0]]
+        while queue:
+            source = queue.pop(0)
+            for edge_source, target, _, _, _ in self.edges:
+                if edge_source == source and target not in layers:
+                    layers[target] = layers[source] + 1
+                    queue.append(target)
+        for node_id in self.node_ids:
+            layers.setdefault(node_id, max(layers.values()) + 1)
+
+        rows = {}
+        for node_id in self.node_ids:
+            rows.setdefault(layers[node_id], []).append(node_id)
+        # Nodes follow the order of their parents in the layer above, which avoids most edge crossings
+        for layer in sorted(rows)[1:]:
+            above = {node_id: i for i, node_id in enumerate(rows[layer - 1])} if layer - 1 in rows else {}
+
+            def parent_order(node_id):
+                parents = [above[source] for source, target, _, _, _ in self.edges
+                           if target == node_id and source in above]
+                return sum(parents) / len(parents) if parents else len(above)
+
+            rows[layer].sort(key=parent_order)
+
+        self.width = (max(len(row) for row in rows.values())
+                      * (Constants.GRAPH_IMAGE_NODE_WIDTH + Constants.GRAPH_IMAGE_GAP)
+                      + Constants.GRAPH_IMAGE_GAP + 2 * Constants.GRAPH_IMAGE_LABEL_MARGIN)
+        self.height = (len(rows) * (Constants.GRAPH_IMAGE_NODE_HEIGHT + Constants.GRAPH_IMAGE_GAP)
+                       + Constants.GRAPH_IMAGE_GAP)
+
+        positions = {}
+        for layer, row in rows.items():
+            y = Constants.GRAPH_IMAGE_GAP + layer * (Constants.GRAPH_IMAGE_NODE_HEIGHT + Constants.GRAPH_IMAGE_GAP) \
+                + Constants.GRAPH_IMAGE_NODE_HEIGHT / 2
+            for i, node_id in enumerate(row):
+                x = (Constants.GRAPH_IMAGE_LABEL_MARGIN
+                     + (self.width - 2 * Constants.GRAPH_IMAGE_LABEL_MARGIN) * (i + 1) / (len(row) + 1))
+                positions[node_id] = (x, y)
+        return positions
+
+    def render(self, path=None, conditions=None):
+        # path is the list of node ids the run went through, start and end included,
+        # conditions the (source, condition) pairs of the conditional edges it took, in order
+        path_edges = self.get_path_edges(path or [], conditions or [])
+        if path_edges not in self.cache:
+            self.cache[path_edges] = Utility.base64_encode_bytes(self.draw(path or [], set(path_edges)))
+        return self.cache[path_edges]
+
+    @staticmethod
+    def get_path_edges(path, conditions):
+        conditions = list(conditions)
+        path_edges = []
+        for source, target in zip(path, path[1:]):
+            condition = conditions.pop(0)[1] if conditions and conditions[0][0] == source else None
+            path_edges.append((source, target, condition))
+        return tuple(path_edges)
+
+    def draw(self, path, path_edges):
+        image = Image.new('RGB', (int(self.width), int(self.height)), Constants.GRAPH_IMAGE_BACKGROUND)
+        draw = ImageDraw.Draw(image)
+
+        # Edges between the same two nodes, either way, are spread across the line between them
+        node_pairs = {}
+        for edge in self.edges:
+            node_pairs.setdefault(frozenset(edge[:2]), []).append(edge)
+        labels = []
+        path_pairs = {(source, target) for source, target, _ in path_edges}
+        for source, target, label, conditional, condition in self.edges:
+            # An edge whose condition is not known is matched by its nodes alone
+            on_path = ((source, target, condition) in path_edges if condition is not None
+                       else (source, target) in path_pairs)
+            color = Constants.GRAPH_IMAGE_PATH_COLOR if on_path else Constants.GRAPH_IMAGE_EDGE_COLOR
+            width = 3 if on_path else 1
+            siblings = node_pairs[frozenset((source, target))]
+            slot = siblings.index((source, target, label, conditional, condition))
+            if source == target:
+                labels.append(self.draw_self_loop(draw, source, label, color, width, slot))
+            else:
+                # Measured in the direction of the first edge of the pair, so reverse edges take the other side
+                offset = (slot - (len(siblings) - 1) / 2) * 2 * Constants.GRAPH_IMAGE_EDGE_OFFSET
+                if (source, target) != siblings[0][:2]:
+                    offset = -offset
+                labels.append(self.draw_edge(draw, source, target, label, conditional, color, width, offset,
+                                             (slot + 1) / (len(siblings) + 1)))
+
+        # Labels go on top of every line, on a background box so lines crossing them do not hide the text
+        for label in labels:
+            if label:
+                position, text, anchor = label
+                box = draw.textbbox(position, text, font=self.font, anchor=anchor)
+                draw.rectangle((box[0] - 2, box[1] - 1, box[2] + 2, box[3] + 1), fill=Constants.GRAPH_IMAGE_BACKGROUND)
+                draw.text(position, text, fill=Constants.GRAPH_IMAGE_LABEL_COLOR, font=self.font, anchor=anchor)
+
+        for node_id in self.node_ids:
+            x, y = self.positions[node_id]
+            half_width = Constants.GRAPH_IMAGE_NODE_WIDTH / 2
+            half_height = Constants.GRAPH_IMAGE_NODE_HEIGHT / 2
+            on_path = node_id in path
+            draw.rounded_rectangle((x - half_width, y - half_height, x + half_width, y + half_height), radius=8,
+                                   fill=Constants.GRAPH_IMAGE_PATH_FILL if on_path else Constants.GRAPH_IMAGE_NODE_FILL,
+                                   outline=Constants.GRAPH_IMAGE_PATH_COLOR if on_path else Constants.GRAPH_IMAGE_EDGE_COLOR,
+                                   width=2 if on_path else 1)
+            draw.text((x, y), node_id, fill=Constants.GRAPH_IMAGE_TEXT_COLOR, font=self.font, anchor='mm')
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def get_border_point(self, center, toward):
+        # Where the line from the node center toward a point leaves the node box
+        dx, dy = toward[0] - center[0], toward[1] - center[1]
+        if dx == 0 and dy == 0:
+            return center
+        scale = min(Constants.GRAPH_IMAGE_NODE_WIDTH / 2 / abs(dx) if dx else math.inf,
+                    Constants.GRAPH_IMAGE_NODE_HEIGHT / 2 / abs(dy) if dy else math.inf)
+        return center[0] + dx * scale, center[1] + dy * scale
+
+    def draw_edge(self, draw, source, target, label, conditional, color, width, offset, label_position=0.5):
+        (x1, y1), (x2, y2) = self.positions[source], self.positions[target]
+        length = math.hypot(x2 - x1, y2 - y1)
+        # Shift to the right of the direction of travel, so the two directions do not overlap
+        nx, ny = -(y2 - y1) / length * offset, (x2 - x1) / length * offset
+        start = self.get_border_point((x1 + nx, y1 + ny), (x2 + nx, y2 + ny))
+        end = self.get_border_point((x2 + nx, y2 + ny), (x1 + nx, y1 + ny))
+
+        if conditional:
+            self.draw_dashed_line(draw, start, end, color, width)
+        else:
+            draw.line((start, end), fill=color, width=width)
+        self.draw_arrow_head(draw, start, end, color)
+        if not label:
+            return None
+        # Parallel edges put their labels at different points along the line, so they do not overlap
+        return ((start[0] + (end[0] - start[0]) * label_position, start[1] + (end[1] - start[1]) * label_position),
+                label, 'mm')
+
+    def draw_self_loop(self, draw, node_id, label, color, width, slot=0):
+        # Half an ellipse on the side of the node that faces the image border, away from the other nodes
+        x, y = self.positions[node_id]
+        side = -1 if x < self.width / 2 else 1
+        edge_x = x + side * Constants.GRAPH_IMAGE_NODE_WIDTH / 2
+        radius_x, radius_y = Constants.GRAPH_IMAGE_LOOP_RADIUS, Constants.GRAPH_IMAGE_NODE_HEIGHT / 3
+        draw.arc((edge_x - radius_x, y - radius_y, edge_x + radius_x, y + radius_y),
+                 start=-90 if side > 0 else 90, end=90 if side > 0 else 270, fill=color, width=width)
+        self.draw_arrow_head(draw, (edge_x + side * radius_x / 2, y + radius_y), (edge_x, y + radius_y), color)
+        if not label:
+            return None
+        # Loops of several conditions share the arc, their labels are stacked
+        return ((edge_x + side * (radius_x + 4), y + slot * Constants.GRAPH_IMAGE_FONT_SIZE), label,
+                'lm' if side > 0 else 'rm')
+
+    @staticmethod
+    def draw_dashed_line(draw, start, end, color, width):
+        length = math.hypot(end[0] - start[0], end[1] - start[1])
+        dash = Constants.GRAPH_IMAGE_DASH_LENGTH
+        for i in range(0, int(length), dash * 2):
+            t1, t2 = i / length, min(i + dash, length) / length
+            draw.line(((start[0] + (end[0] - start[0]) * t1, start[1] + (end[1] - start[1]) * t1),
+                       (start[0] + (end[0] - start[0]) * t2, start[1] + (end[1] - start[1]) * t2)),
+                      fill=color, width=width)
+
+    @staticmethod
+    def draw_arrow_head(draw, start, end, color):
+        angle = math.atan2(end[1] - start[1], end[0] - start[0])
+        size = Constants.GRAPH_IMAGE_ARROW_SIZE
+        left = (end[0] - size * math.cos(angle - math.pi / 7), end[1] - size * math.sin(angle - math.pi / 7))
+        right = (end[0] - size * math.cos(angle + math.pi / 7), end[1] - size * math.sin(angle + math.pi / 7))
+        draw.polygon((end, left, right), fill=color)
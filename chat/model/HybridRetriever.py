@@ -0,0 +1,36 @@
+from typing import Any
+
+from langchain_core.vectorstores import VectorStoreRetriever
+
+from util.Constants import Constants
+
+
+class HybridRetriever(VectorStoreRetriever):
+    """
+    Fuses dense similarity search with BM25 keyword search by reciprocal rank fusion.
+    Exact terms such as part numbers or error codes are found even when their embedding is not close to the question.
+    """
+    bm25_index: Any = None
+    rrf_k: int = Constants.RRF_K
+    fetch_factor: int = Constants.HYBRID_FETCH_FACTOR
+
+    def _get_relevant_documents(self, query, *, run_manager, **kwargs):
+        k = (self.search_kwargs | kwargs).get('k', Constants.HYBRID_DEFAULT_K)
+        fetch_k = k * self.fetch_factor
+        dense_docs = self.vectorstore.similarity_search(query, k=fetch_k)
+        lexical_docs = [self.get_document(row) for row, _ in self.bm25_index.search(query, fetch_k)]
+
+        scores = {}
+        docs = {}
+        for ranking in (dense_docs, lexical_docs):
+            for rank, doc in enumerate(ranking):
+                key = doc.metadata.get('chunk_hash') or doc.page_content
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                docs.setdefault(key, doc)
+        return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+    def get_document(self, row):
+        # BM25 rows are the insertion order of the vector store
+        if hasattr(self.vectorstore, 'index_to_docstore_id'):
+            return self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[row])
+        return self.vectorstore.get_document(row)
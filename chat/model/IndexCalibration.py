@@ -0,0 +1,55 @@
+import numpy as np
+
+from util.Constants import Constants
+
+
+class IndexCalibration:
+    """
+    Scores of an index measured once at build time and saved in its cache manifest.
+    The reference is the top-1 distance of questions the documents do not answer (the web search exemplars),
+    so thresholds are fractions of it instead of absolute cosines that depend on the embedding model.
+    Distances are the vector store's own, L2 for FAISS and cosine distance for SKLearn, lower is closer.
+    """
+
+    def __init__(self, calibration):
+        self.centroid = np.asarray(calibration['centroid'], dtype=np.float32)
+        self.reference_distance = float(np.median(calibration['websearch_distances']))
+        self.reference_centroid_score = float(np.median(calibration['websearch_centroid_scores']))
+
+    @staticmethod
+    def normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    @staticmethod
+    def add_directions(direction_sum, vectors):
+        # Running sum of the unit chunk vectors, kept during the build instead of the vectors themselves
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        directions = (vectors / np.where(norms > 0, norms, 1)).sum(axis=0, dtype=np.float64)
+        return directions if direction_sum is None else direction_sum + directions
+
+    @staticmethod
+    def create(store, embedding, direction_sum, exemplars=Constants.FAST_ROUTER_WEBSEARCH_EXEMPLARS):
+        # The centroid is the direction of the summed chunk directions, see add_directions
+        centroid = IndexCalibration.normalize(direction_sum)
+        exemplar_vectors = [embedding.embed_query(exemplar) for exemplar in exemplars]
+        return {
+            'centroid': centroid.tolist(),
+            'websearch_distances': [IndexCalibration.get_top_distance(store, vector) for vector in exemplar_vectors],
+            'websearch_centroid_scores': [float(centroid @ IndexCalibration.normalize(vector))
+                                          for vector in exemplar_vectors],
+        }
+
+    @staticmethod
+    def get_top_distance(store, vector):
+        return float(store.similarity_search_with_score_by_vector(vector, k=1)[0][1])
+
+    def get_relative_distance(self, distance):
+        # 1.0 is as far as a typical question the index cannot answer
+        if self.reference_distance <= 0:
+            return float('inf')
+        return distance / self.reference_distance
+
+    def get_centroid_score(self, vector):
+        return float(self.centroid @ self.normalize(vector))
@@ -0,0 +1,5 @@
+class IngestionStopped(Exception):
+    """
+    Raised at a cancellation point once a document ingestion has been asked to stop.
+    """
+    pass
@@ -0,0 +1,439 @@
+import json
+import operator
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Annotated
+from langchain_community.tools import TavilySearchResults
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_ollama import ChatOllama
+from langgraph.constants import END, START
+from langgraph.graph import StateGraph
+from typing_extensions import TypedDict
+
+from chat.model.FastRouter import FastRouter
+from chat.model.GraphImageRenderer import GraphImageRenderer
+from chat.model.IndexCalibration import IndexCalibration
+from chat.model.LocalWebSearch import LocalWebSearch
+from util.AnswerCache import AnswerCache
+from util.Constants import Constants, LANGCHAIN_CONSTANT, MODEL_MESSAGE
+from util.IndexCache import IndexCache
+from util.LLMMemoCache import LLMMemoCache
+from util.WebSearchCache import WebSearchCache
+
+
+class GraphState(TypedDict):
+    """
+    Graph state is a dictionary that contains information we want to propagate to, and modify in, each graph node.
+    """
+    question: str  # User question
+    generation: str  # LLM generation
+    web_search: str  # Binary decision to run web search
+    max_retries: int  # Max number of retries for answer generation
+    answers: int  # Number of answers generated
+    loop_step: Annotated[int, operator.add]
+    documents: List[str]  # List of retrieved documents
+
+
+class LangchainWorkflowEngine:
+    """
+    Long-lived workflow for one configuration, the LLM clients, the web search tool and the compiled graph
+    are built once and reused for every question. Questions run one at a time, start_run resets the per-question state.
+    """
+
+    def __init__(self, args):
+        self.prompt_list = args['prompt_list']
+        self.retriever = args["retriever"]
+        self.llm_name = args["llm_name"]
+        self.search_result = args["search_result"]
+        self.max_retries = args["max_retries"]
+        self.batch_grading = args.get("batch_grading", Constants.BATCH_GRADING)
+        self.answer_cache_threshold = args.get("answer_cache_threshold", Constants.ANSWER_CACHE_THRESHOLD)
+        self.web_search_backend = args.get("web_search_backend", Constants.WEB_SEARCH_BACKEND)
+        self.fast_router = args.get("fast_router", Constants.FAST_ROUTER)
+        self.fast_router_margin = args.get("fast_router_margin", Constants.FAST_ROUTER_MARGIN)
+        self.score_gating = args.get("score_gating", Constants.SCORE_GATING)
+        self.score_gating_accept = args.get("score_gating_accept", Constants.SCORE_GATING_ACCEPT)
+        self.score_gating_reject = args.get("score_gating_reject", Constants.SCORE_GATING_REJECT)
+
+        # Answers are reused for the same index, llm and prompts only
+        self.index_metadata = getattr(self.retriever, 'metadata', None) or {}
+        self.answer_model = f"{self.llm_name}:{IndexCache.hash_dict(self.prompt_list)}"
+        self.answer_cache = None
+        if self.answer_cache_threshold > 0 and 'index_key' in self.index_metadata:
+            self.answer_cache = AnswerCache()
+        self.question_vector = None
+        # Indexes cached before the calibration was saved keep the LLM router and grade every doc
+        self.calibration = self.load_calibration()
+        self.router = None
+        if self.fast_router and self.calibration is not None:
+            self.router = FastRouter(self.retriever.vectorstore, self.calibration, self.fast_router_margin)
+
+        self.graph = None
+        self.valid_source = None
+        self.invalid_source = None
+        self.final_response = {}
+        self.path = []
+        # (source node, condition) of every conditional edge taken, for the graph image
+        self.conditions = []
+        self.graph_renderer = None
+        self.token_callback = None
+        self.generation_callback = None
+
+        self.llm = ChatOllama(model=self.llm_name, temperature=0)
+        self.llm_json_mode = ChatOllama(model=self.llm_name, temperature=0, format='json')
+        # The router and the graders run at temperature 0, the same prompt gets the same answer
+        if Constants.LLM_MEMO_CACHE:
+            self.llm_json_mode = LLMMemoCache(self.llm_json_mode)
+
+        self.web_search_tool = WebSearchCache(self.create_web_search_tool(), self.web_search_backend,
+                                              self.search_result)
+        self.generate_workflow()
+
+    @staticmethod
+    def get_config_key(args):
+        return (args["llm_name"], tuple(sorted(args['prompt_list'].items())), id(args["retriever"]),
+                args["search_result"], args["max_retries"], args.get("batch_grading", Constants.BATCH_GRADING),
+                args.get("answer_cache_threshold", Constants.ANSWER_CACHE_THRESHOLD),
+                args.get("web_search_backend", Constants.WEB_SEARCH_BACKEND),
+                args.get("fast_router", Constants.FAST_ROUTER),
+                args.get("fast_router_margin", Constants.FAST_ROUTER_MARGIN),
+                args.get("score_gating", Constants.SCORE_GATING),
+                args.get("score_gating_accept", Constants.SCORE_GATING_ACCEPT),
+                args.get("score_gating_reject", Constants.SCORE_GATING_REJECT))
+
+    def load_calibration(self):
+        index_cache = IndexCache()
+        index_key = self.index_metadata.get('index_key')
+        if index_key is None or not index_cache.contains(index_key):
+            return None
+        calibration = index_cache.load_manifest(index_key).get('calibration')
+        return IndexCalibration(calibration) if calibration else None
+
+    def close(self):
+        # The sqlite connections of the caches, called before a new configuration replaces this engine
+        if self.answer_cache is not None:
+            self.answer_cache.close()
+            self.answer_cache = None
+        if isinstance(self.llm_json_mode, LLMMemoCache):
+            self.llm_json_mode.close()
+
+    def create_web_search_tool(self):
+        if self.web_search_backend == Constants.WEB_SEARCH_BACKEND_LOCAL:
+            return LocalWebSearch(k=self.search_result)
+        return TavilySearchResults(k=self.search_result)
+
+    def start_run(self, token_callback=None, generation_callback=None):
+        self.valid_source = None
+        self.invalid_source = None
+        self.final_response = {}
+        self.path = [START]
+        self.conditions = []
+        self.question_vector = None
+        self.token_callback = token_callback
+        self.generation_callback = generation_callback
+
+    def get_cached_answer(self, question):
+        # Returns (answer, image_data) of an earlier question close enough to this one
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.get_answer(self.index_metadata['index_key'], self.answer_model,
+                                              self.get_question_vector(question), self.answer_cache_threshold)
+        if cached is None:
+            return None
+        answer, image_data, similarity = cached
+        print(f"{MODEL_MESSAGE.ANSWER_CACHE_HIT} {similarity:.3f}")
+        return answer, image_data
+
+    def put_cached_answer(self, question, answer, image_data):
+        if self.answer_cache is None or self.question_vector is None:
+            return
+        # Answers built from web results (news, weather, prices) go stale, the search is run again instead
+        if "websearch" in self.path:
+            return
+        self.answer_cache.put_answer(self.index_metadata.get('lineage_key', ''), self.index_metadata['index_key'],
+                                     self.answer_model, question, self.question_vector, answer, image_data)
+
+    def get_question_vector(self, question):
+        # Shared by the answer cache and the fast router, the question is embedded once
+        if self.question_vector is None:
+            self.question_vector = self.retriever.vectorstore.embeddings.embed_query(question)
+        return self.question_vector
+
+    def route_question(self, state):
+        if self.router is not None:
+            source, scores = self.router.route(self.get_question_vector(state["question"]))
+            score_text = ", ".join(f"{name} {score:.3f}" for name, score in scores.items())
+            if source is not None:
+                print(f"{MODEL_MESSAGE.FAST_ROUTER_ROUTED} {source} ({score_text})")
+            else:
+                print(f"{MODEL_MESSAGE.FAST_ROUTER_FALLBACK} ({score_text})")
+                source = self.route_question_llm(state["question"])
+        else:
+            source = self.route_question_llm(state["question"])
+
+        if source == 'websearch':
+            self.final_response["route_type"] = "websearch"
+            return "websearch"
+        elif source == 'vectorstore':
+            self.final_response["route_type"] = "vectorstore"
+            return "vectorstore"
+
+    def route_question_llm(self, question):
+        route_question = self.llm_json_mode.invoke(
+            [SystemMessage(content=self.prompt_list['router_instruction'])] + [
+                HumanMessage(content=question)])
+        return json.loads(route_question.content)['datasource']
+
+    def retrieve(self, state):
+        self.path.append("retrieve")
+        question = state['question']
+        documents = self.retriever.invoke(question)
+        return {"documents": documents}
+
+    def grade_documents(self, state):
+        self.path.append("grade_documents")
+        question = state['question']
+        documents = state['documents']
+
+        scores = self.score_documents(documents, question) if self.score_gating and documents else None
+        if scores is not None:
+            return self.grade_documents_gated(documents, question, scores)
+
+        valid_docs = []
+        web_search = "No"
+
+        grades = self.grade_documents_llm(documents, question)
+        for d, grade in zip(documents, grades):
+            if str(grade).lower() == "yes":
+                valid_docs.append(d)
+            else:
+                web_search = "Yes"
+                continue
+        return {"documents": valid_docs, "web_search": web_search}
+
+    def grade_documents_llm(self, documents, question):
+        # Score the docs, in one call for all of them or one call per doc
+        grades = self.grade_documents_batch(documents, question) if self.batch_grading and documents else None
+        if grades is None:
+            grades = self.grade_documents_parallel(documents, question)
+        return grades
+
+    def score_documents(self, documents, question):
+        # Distance of each doc relative to the calibration of the index, 1.0 is as far as an off-topic question.
+        # None for a doc the dense search did not return, a keyword only match of hybrid search
+        if self.calibration is None:
+            return None
+        # Hybrid search fuses the dense results of the same question, fetched with the same factor
+        results = self.retriever.vectorstore.similarity_search_with_score_by_vector(
+            self.get_question_vector(question), k=len(documents) * Constants.HYBRID_FETCH_FACTOR)
+        distances = {}
+        for d, distance in results:
+            distances.setdefault(d.metadata.get('chunk_hash') or d.page_content, float(distance))
+        scores = []
+        for d in documents:
+            distance = distances.get(d.metadata.get('chunk_hash') or d.page_content)
+            scores.append(None if distance is None else self.calibration.get_relative_distance(distance))
+        return scores
+
+    def grade_documents_gated(self, documents, question, scores):
+        # Clear cases are decided by the distance, the LLM grades only the ambiguous band, the closest docs first,
+        # and grading stops once enough docs are relevant
+        accepted = {i for i, score in enumerate(scores) if score is not None and score <= self.score_gating_accept}
+        rejected = {i for i, score in enumerate(scores) if score is not None and score >= self.score_gating_reject}
+        ambiguous = sorted((i for i in range(len(documents)) if i not in accepted and i not in rejected),
+                           key=lambda i: scores[i] if scores[i] is not None else self.score_gating_reject)
+        graded = 0
+        while ambiguous and len(accepted) < Constants.SCORE_GATING_ENOUGH_DOCS:
+            # No more calls than the docs still needed, a batch grades the whole band at once
+            needed = Constants.SCORE_GATING_ENOUGH_DOCS - len(accepted)
+            size = len(ambiguous) if self.batch_grading else min(needed, self.get_grader_parallel())
+            wave, ambiguous = ambiguous[:size], ambiguous[size:]
+            grades = self.grade_documents_llm([documents[i] for i in wave], question)
+            graded += len(wave)
+            for i, grade in zip(wave, grades):
+                (accepted if str(grade).lower() == "yes" else rejected).add(i)
+
+        print(f"{MODEL_MESSAGE.SCORE_GATING} accepted {len(accepted)}, rejected {len(rejected)}, "
+              f"graded {graded} of {len(documents)}")
+        valid_docs = [d for i, d in enumerate(documents) if i in accepted]
+        # Web search only when relevant docs are missing, not for every irrelevant one
+        web_search = "Yes" if rejected and len(accepted) < Constants.SCORE_GATING_ENOUGH_DOCS else "No"
+        return {"documents": valid_docs, "web_search": web_search}
+
+    def grade_documents_batch(self, documents, question):
+        # The instruction is sent and prefilled once for every doc
+        docs_txt = "\n\n".join(f"Document {i + 1}:\n{d.page_content}" for i, d in enumerate(documents))
+        doc_grader_batch_prompt_formatted = self.prompt_list['doc_grader_batch_prompt'].format(
+            documents=docs_txt, question=question, count=len(documents))
+        doc_grader_batch_instruction = self.prompt_list['doc_grader_batch_instruction'].format(
+            documents=docs_txt, question=question, count=len(documents))
+        result = self.llm_json_mode.invoke(
+            [SystemMessage(content=doc_grader_batch_instruction)] + [
+                HumanMessage(content=doc_grader_batch_prompt_formatted)])
+        try:
+            grades = json.loads(result.content)['binary_score']
+        except (ValueError, KeyError, TypeError):
+            grades = None
+        if not isinstance(grades, list) or len(grades) != len(documents):
+            print(f"{LANGCHAIN_CONSTANT.BATCH_GRADING_FALLBACK}")
+            return None
+        return grades
+
+    def grade_documents_parallel(self, documents, question):
+        # map keeps the retrieval order
+        with ThreadPoolExecutor(max_workers=max(1, min(len(documents), self.get_grader_parallel()))) as executor:
+            return list(executor.map(lambda d: self.grade_document(d, question), documents))
+
+    def grade_document(self, document, question):
+        doc_grader_prompt_formatted = self.prompt_list['doc_grader_prompt'].format(document=document.page_content,
+                                                                                   question=question)
+        doc_grader_instruction = self.prompt_list['doc_grader_instruction'].format(document=document.page_content,
+                                                                                   question=question)
+        result = self.llm_json_mode.invoke(
+            [SystemMessage(content=doc_grader_instruction)] + [HumanMessage(content=doc_grader_prompt_formatted)])
+        return json.loads(result.content)['binary_score']
+
+    @staticmethod
+    def get_grader_parallel():
+        # Requests beyond the slots Ollama serves in parallel only wait in its queue
+        try:
+            return max(1, int(os.environ.get(LANGCHAIN_CONSTANT.OLLAMA_NUM_PARALLEL, Constants.GRADER_MAX_PARALLEL)))
+        except ValueError:
+            return Constants.GRADER_MAX_PARALLEL
+
+    def decide_to_generate(self, state):
+        web_search = state["web_search"]
+
+        if web_search.lower() == "yes":
+            self.final_response["route_type"] = "websearch"
+            return "websearch"
+        else:
+            return "generate"
+
+    def web_search(self, state):
+        self.path.append("websearch")
+        question = state['question']
+        documents = state.get("documents", [])
+
+        # Web search, Tavily or the local stub, repeated queries are served from the cache
+        docs = self.web_search_tool.invoke({"query": question})
+        web_results = "\n".join([d["content"] for d in docs])
+        web_results = Document(page_content=web_results)
+        documents.append(web_results)
+        return {"documents": documents}
+
+    def generate(self, state):
+        self.path.append("generate")
+        question = state['question']
+        documents = state['documents']
+        loop_step = state.get('loop_step', 0)
+        docs_txt = self.format_docs(documents)
+        rag_prompt_formatted = self.prompt_list['rag_prompt'].format(context=docs_txt, question=question)
+
+        # Tokens are shown as they arrive, the graders still see the whole generation
+        if self.generation_callback:
+            self.generation_callback()
+        generation = None
+        for chunk in self.llm.stream([HumanMessage(content=rag_prompt_formatted)]):
+            generation = chunk if generation is None else generation + chunk
+            if chunk.content and self.token_callback:
+                self.token_callback(chunk.content)
+        return {"generation": generation, "loop_step": loop_step + 1}
+
+    def grade_generation_v_documents_and_question(self, state):
+        question = state["question"]
+        documents = state["documents"]
+        generation = state["generation"]
+        max_retries = self.max_retries
+
+        hallucination_grader_prompt_formatted = self.prompt_list['hallucination_grader_prompt'].format(
+            documents=self.format_docs(documents),
+            generation=generation.content)
+        result = self.llm_json_mode.invoke(
+            [SystemMessage(content=self.prompt_list['hallucination_grader_instruction'])] + [
+                HumanMessage(content=hallucination_grader_prompt_formatted)])
+        grade = json.loads(result.content)['binary_score']
+
+        if grade == "yes":
+            answer_grader_prompt_formatted = self.prompt_list['answer_grader_prompt'].format(question=question,
+                                                                                             generation=generation.content)
+            result = self.llm_json_mode.invoke(
+                [SystemMessage(content=self.prompt_list['answer_grader_instruction'])] + [
+                    HumanMessage(content=answer_grader_prompt_formatted)])
+            grade = json.loads(result.content)['binary_score']
+
+            if grade == "yes":
+                self.valid_source = True
+                return "useful"
+            elif state["loop_step"] <= max_retries:
+                self.valid_source = False
+                return "not useful"
+            else:
+                self.valid_source = False
+                return "max retries"
+        elif state["loop_step"] <= max_retries:
+            self.invalid_source = True
+            return "not supported"
+        else:
+            self.invalid_source = True
+            return "max retries"
+
+    def generate_workflow(self):
+        self.workflow = StateGraph(GraphState)
+
+        # Define the nodes
+        self.workflow.add_node("websearch", self.web_search)
+        self.workflow.add_node("retrieve", self.retrieve)
+        self.workflow.add_node("grade_documents", self.grade_documents)
+        self.workflow.add_node("generate", self.generate)
+
+        # Build graph
+        self.workflow.set_conditional_entry_point(
+            self.record_condition(self.route_question),
+            {
+                "websearch": "websearch",
+                "vectorstore": "retrieve",
+            }
+        )
+
+        self.workflow.add_edge("websearch", "generate")
+        self.workflow.add_edge("retrieve", "grade_documents")
+        self.workflow.add_conditional_edges(
+            "grade_documents",
+            self.record_condition(self.decide_to_generate),
+            {
+                "websearch": "websearch",
+                "generate": "generate",
+            }
+        )
+        self.workflow.add_conditional_edges(
+            "generate",
+            self.record_condition(self.grade_generation_v_documents_and_question),
+            {
+                "not supported": "generate",
+                "useful": END,
+                "not useful": "websearch",
+                "max retries": END,
+            }
+        )
+        self.graph = self.workflow.compile()
+
+    def format_docs(self, docs):
+        return "\n\n".join(doc.page_content for doc in docs)
+
+    def get_graph_image(self):
+        # Rendered locally once per compiled graph, the path overlay is cached per path
+        if self.graph_renderer is None:
+            self.graph_renderer = GraphImageRenderer(self.graph)
+        if not Constants.GRAPH_IMAGE_SHOW_PATH:
+            return self.graph_renderer.render()
+        return self.graph_renderer.render(self.path + [END], self.conditions)
+
+    def record_condition(self, condition_function):
+        # Wraps a conditional edge function, the condition it returns is kept with the node it was taken from
+        def record(state):
+            condition = condition_function(state)
+            self.conditions.append((self.path[-1], condition))
+            return condition
+        return record
@@ -1,7 +1,8 @@
 from PyQt6.QtCore import QObject, pyqtSignal
 
+from chat.model.LangchainWorkflowEngine import LangchainWorkflowEngine
 from chat.model.LangchainWorkflowThread import LangchainWorkflowThread
-from util.Constants import MODEL_MESSAGE
+from util.Constants import Constants, MODEL_MESSAGE
 
 
 class LangchainWorkflowModel(QObject):
@@ -9,15 +10,27 @@ class LangchainWorkflowModel(QObject):
     thread_finished_signal = pyqtSignal()
     response_signal = pyqtSignal(str, str)
     response_finished_signal = pyqtSignal(str, str, float, bool)
+    generation_started_signal = pyqtSignal()
+    token_signal = pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
         self.langchain_workflow_thread = None
+        self.workflow_engine = None
+        self.workflow_engine_key = None
         self._prompt_list = None
         self._retriever = None
         self._llm_name = None
         self._search_result = None
         self._max_retries = None
+        self._batch_grading = False
+        self._fast_router = Constants.FAST_ROUTER
+        self._fast_router_margin = Constants.FAST_ROUTER_MARGIN
+        self._score_gating = Constants.SCORE_GATING
+        self._score_gating_accept = Constants.SCORE_GATING_ACCEPT
+        self._score_gating_reject = Constants.SCORE_GATING_REJECT
+        self._answer_cache_threshold = 0.0
+        self._web_search_backend = Constants.WEB_SEARCH_BACKEND
 
     def handle_thread_finished(self):
         print(f"{MODEL_MESSAGE.THREAD_FINISHED}")
@@ -34,18 +47,38 @@ class LangchainWorkflowModel(QObject):
             self.langchain_workflow_thread.wait()
 
         args = {}
-        args["question"] = question
         args["prompt_list"] = self.prompt_list
         args["retriever"] = self.retriever
         args["llm_name"] = self.llm_name
         args["search_result"] = self.search_result
         args["max_retries"] = self.max_retries
-
-        self.langchain_workflow_thread = LangchainWorkflowThread(args)
+        args["batch_grading"] = self.batch_grading
+        args["fast_router"] = self.fast_router
+        args["fast_router_margin"] = self.fast_router_margin
+        args["score_gating"] = self.score_gating
+        args["score_gating_accept"] = self.score_gating_accept
+        args["score_gating_reject"] = self.score_gating_reject
+        args["answer_cache_threshold"] = self.answer_cache_threshold
+        args["web_search_backend"] = self.web_search_backend
+
+        # Built again only when the configuration changes
+        engine_key = LangchainWorkflowEngine.get_config_key(args)
+        if self.workflow_engine is None or self.workflow_engine_key != engine_key:
+            # The previous question has finished above, nothing uses the old engine anymore
+            if self.workflow_engine is not None:
+                self.workflow_engine.close()
+            self.workflow_engine = LangchainWorkflowEngine(args)
+            self.workflow_engine_key = engine_key
+            print(f"{MODEL_MESSAGE.WORKFLOW_ENGINE_CREATED} {self.llm_name}")
+
+        self.langchain_workflow_thread = LangchainWorkflowThread({"question": question,
+                                                                  "engine": self.workflow_engine})
         self.langchain_workflow_thread.started.connect(self.thread_started_signal.emit)
         self.langchain_workflow_thread.finished.connect(self.handle_thread_finished)
         self.langchain_workflow_thread.response_signal.connect(self.response_signal.emit)
         self.langchain_workflow_thread.response_finished_signal.connect(self.response_finished_signal.emit)
+        self.langchain_workflow_thread.generation_started_signal.connect(self.generation_started_signal.emit)
+        self.langchain_workflow_thread.token_signal.connect(self.token_signal.emit)
         self.langchain_workflow_thread.start()
 
     @property
@@ -87,3 +120,67 @@ class LangchainWorkflowModel(QObject):
     @search_result.setter
     def search_result(self, value):
         self._search_result = value
+
+    @property
+    def batch_grading(self):
+        return self._batch_grading
+
+    @batch_grading.setter
+    def batch_grading(self, value):
+        self._batch_grading = value
+
+    @property
+    def fast_router(self):
+        return self._fast_router
+
+    @fast_router.setter
+    def fast_router(self, value):
+        self._fast_router = value
+
+    @property
+    def fast_router_margin(self):
+        return self._fast_router_margin
+
+    @fast_router_margin.setter
+    def fast_router_margin(self, value):
+        self._fast_router_margin = value
+
+    @property
+    def score_gating(self):
+        return self._score_gating
+
+    @score_gating.setter
+    def score_gating(self, value):
+        self._score_gating = value
+
+    @property
+    def score_gating_accept(self):
+        return self._score_gating_accept
+
+    @score_gating_accept.setter
+    def score_gating_accept(self, value):
+        self._score_gating_accept = value
+
+    @property
+    def score_gating_reject(self):
+        return self._score_gating_reject
+
+    @score_gating_reject.setter
+    def score_gating_reject(self, value):
+        self._score_gating_reject = value
+
+    @property
+    def answer_cache_threshold(self):
+        return self._answer_cache_threshold
+
+    @answer_cache_threshold.setter
+    def answer_cache_threshold(self, value):
+        self._answer_cache_threshold = value
+
+    @property
+    def web_search_backend(self):
+        return self._web_search_backend
+
+    @web_search_backend.setter
+    def web_search_backend(self, value):
+        self._web_search_backend = value
@@ -0,0 +1,35 @@
+import json
+import os
+import time
+
+from util.Constants import Constants, UI
+from util.WebSearchCache import WebSearchCache
+
+
+class LocalWebSearch:
+    """
+    Offline stand-in for TavilySearchResults, returns canned results from a local JSON file.
+    The file maps queries to lists of {"url": ..., "content": ...}, a "*" entry answers any other query.
+    An optional delay stands in for the network round-trip.
+    """
+
+    def __init__(self, k, results_file=Constants.LOCAL_WEB_SEARCH_FILE, delay=Constants.LOCAL_WEB_SEARCH_DELAY):
+        self.k = k
+        self.results_file = results_file
+        self.delay = delay
+
+    def load_results(self):
+        if not os.path.isfile(self.results_file):
+            return {}
+        with open(self.results_file, encoding=UI.UTF_8) as file:
+            return {WebSearchCache.normalize_query(query): results for query, results in json.load(file).items()}
+
+    def invoke(self, tool_input):
+        if self.delay:
+            time.sleep(self.delay)
+        query = tool_input["query"]
+        results = self.load_results()
+        matched = results.get(WebSearchCache.normalize_query(query), results.get("*"))
+        if matched is None:
+            matched = [{"url": Constants.LOCAL_WEB_SEARCH_URL, "content": f"{UI.LOCAL_WEB_SEARCH_NO_RESULT} {query}"}]
+        return matched[:self.k]
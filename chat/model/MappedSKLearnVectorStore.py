@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+from langchain_community.vectorstores import SKLearnVectorStore
+from langchain_core.documents import Document
+
+from util.Constants import Constants
+
+
+class MappedSKLearnVectorStore(SKLearnVectorStore):
+    """
+    SKLearnVectorStore that persists its embedding matrix as a float32 .npy file next to the serialized texts.
+    On load the matrix is memory mapped instead of parsed, so app instances share it through the page cache.
+    The matrix is the index cache entry's chunk_vectors.npy, the incremental re-index reads the same file.
+    """
+
+    def __init__(self, embedding, *, persist_path=None, serializer="json", mmap=True, **kwargs):
+        # Read by _load, which the parent constructor calls
+        self.mmap = mmap
+        super().__init__(embedding, persist_path=persist_path, serializer=serializer, **kwargs)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_path=None, **kwargs):
+        # The parent always builds a plain SKLearnVectorStore
+        store = cls(embedding, persist_path=persist_path, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def get_vectors_path(self):
+        return os.path.join(os.path.dirname(self._persist_path), Constants.INDEX_CACHE_CHUNK_VECTORS)
+
+    def get_legacy_vectors_path(self):
+        return os.path.join(os.path.dirname(self._persist_path), Constants.SKLEARN_VECTORS_FILE)
+
+    def persist(self):
+        self._serializer.save({
+            "ids": self._ids,
+            "texts": self._texts,
+            "metadatas": self._metadatas,
+            "embeddings": [],
+        })
+        np.save(self.get_vectors_path(), np.asarray(self._embeddings, dtype=np.float32))
+
+    def _load(self):
+        data = self._serializer.load()
+        self._texts = data["texts"]
+        self._metadatas = data["metadatas"]
+        self._ids = data["ids"]
+        # Older entries have their own matrix next to a chunk_vectors.npy in a different row order
+        if os.path.isfile(self.get_legacy_vectors_path()):
+            self._embeddings = np.load(self.get_legacy_vectors_path(), mmap_mode='r' if self.mmap else None)
+        elif os.path.isfile(self.get_vectors_path()):
+            self._embeddings = np.load(self.get_vectors_path(), mmap_mode='r' if self.mmap else None)
+        else:
+            # Saved before the matrix moved out of the serialized data
+            self._embeddings = data["embeddings"]
+        self._update_neighbors()
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        # Same as FAISS, for callers that already have the query vector
+        # NearestNeighbors does not accept more neighbours than rows, FAISS returns what it has
+        k = min(k, len(self._texts))
+        return [(self.get_document(row), distance)
+                for row, distance in self._similarity_index_search_with_score(embedding, k=k, **kwargs)]
+
+    def get_document(self, row):
+        return Document(page_content=self._texts[row], metadata={"id": self._ids[row], **self._metadatas[row]})
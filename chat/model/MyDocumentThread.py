@@ -1,14 +1,36 @@
+import math
+import multiprocessing
 import os
+import pickle
+import queue
+import threading
 import time
+from functools import partial
 
+import faiss
+import numpy as np
 from PyQt6.QtCore import QThread, pyqtSignal
-from langchain_community.document_loaders import TextLoader, PyMuPDFLoader, Docx2txtLoader
-from langchain_community.vectorstores import SKLearnVectorStore, FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.document_loaders import TextLoader, Docx2txtLoader
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStoreRetriever
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from util.Constants import Constants, UI
+from chat.model.BM25Index import BM25Index
+from chat.model.BinaryQuantizedIndex import BinaryQuantizedIndex
+from chat.model.BucketedEmbeddings import BucketedEmbeddings
+from chat.model.ChunkDeduplicator import ChunkDeduplicator
+from chat.model.HybridRetriever import HybridRetriever
+from chat.model.IndexCalibration import IndexCalibration
+from chat.model.IngestionStopped import IngestionStopped
+from chat.model.MappedSKLearnVectorStore import MappedSKLearnVectorStore
+from chat.model.ParallelPyMuPDFLoader import ParallelPyMuPDFLoader
+from util.AnswerCache import AnswerCache
+from util.Constants import Constants, UI, FILE_INDEX_MESSAGE
+from util.EmbeddingCache import EmbeddingCache
+from util.EmbeddingModelPool import EmbeddingModelPool
+from util.IndexCache import IndexCache
 
 
 class MyDocumentThread(QThread):
@@ -24,47 +46,345 @@ class MyDocumentThread(QThread):
         self.chunk_size = args['chunk_size']
         self.chunk_overlap = args['chunk_overlap']
         self.retrieve_docs = args['retrieve_docs']
-        self.file_path = args['file_path']
+        self.file_paths = args['file_paths']
+        self.streaming = args.get('streaming', False)
+        self.embedding_batch_size = args.get('embedding_batch_size', 0)
+        self.ef_search = args.get('ef_search', Constants.HNSW_EF_SEARCH)
+        self.nprobe = args.get('nprobe', Constants.IVF_NPROBE)
+        self.mmap = args.get('mmap', Constants.INDEX_MMAP)
+        self.hybrid = args.get('hybrid', Constants.HYBRID_SEARCH)
+        self.dedup_threshold = args.get('dedup_threshold', Constants.DEDUP_THRESHOLD)
         self.force_stop = False
+        # PDF page workers, started on the first large PDF and shared by every PDF of this ingestion
+        self.pdf_pool = None
+        self.pdf_pool_lock = threading.Lock()
 
     def run(self):
         self.start_time = time.time()
         try:
-            if not os.path.isfile(self.file_path):
-                raise FileNotFoundError(f"File not found: {self.file_path}")
+            file_paths = DocumentFactory.expand_file_paths(self.file_paths)
+            if not file_paths:
+                raise ValueError(UI.UNSUPPORTED_FILE_TYPE)
 
-            # Document load
-            loader = DocumentFactory.create_document_loader(self.file_path)
-            docs_list = loader.load()
+            # Embedding model, shared with previous ingestions and the retriever
+            hf = EmbeddingModelPool.get_embeddings(self.embedding_model, self.device)
 
-            # Split documents
-            text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-                chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
-            )
-            doc_splits = text_splitter.split_documents(docs_list)
-
-            # Embedding model
-            model_name = self.embedding_model
-            model_kwargs = {"device": self.device, 'trust_remote_code': True}
-            hf = HuggingFaceEmbeddings(
-                model_name=model_name, model_kwargs=model_kwargs
-            )
+            # Reuse a previously built index of the same content and settings
+            index_cache = IndexCache()
+            index_key = index_cache.make_key(file_paths, self.embedding_model, self.chunk_size,
+                                             self.chunk_overlap, self.vector_store, self.dedup_threshold)
+            lineage_key = index_cache.make_lineage_key(self.file_paths, self.embedding_model, self.chunk_size,
+                                                       self.chunk_overlap, self.vector_store, self.dedup_threshold)
+            if index_cache.contains(index_key):
+                load_start_time = time.time()
+                vector_store = VectorStoreFactory.load_vector_store(
+                    self.vector_store,
+                    folder_path=index_cache.get_entry_path(index_key),
+                    embedding=hf,
+                    mmap=self.mmap,
+                    ann_index=index_cache.load_manifest(index_key).get('ann_index'),
+                )
+                print(f"{FILE_INDEX_MESSAGE.INDEX_CACHE_HIT} {index_key} "
+                      f"({time.time() - load_start_time:.3f}s{', mmap' if self.mmap else ''})")
+            else:
+                print(f"{FILE_INDEX_MESSAGE.INDEX_CACHE_MISS} {index_key}")
+                vector_store = self.build_vector_store(file_paths, hf, index_cache, index_key, lineage_key)
+            index_cache.set_latest_key(lineage_key, index_key)
+            self.evict_answers(lineage_key, index_key)
+            # Search-time settings, they do not change the index so they are not part of the cache key
+            VectorStoreFactory.set_search_parameters(vector_store, self.ef_search, self.nprobe)
 
-            # Add to vectorDB
-            vector_store = VectorStoreFactory.create_vector_store(
-                self.vector_store,
-                documents=doc_splits,
-                embedding=hf,
-            )
-            retriever = vector_store.as_retriever(k=self.retrieve_docs)
+            retriever = self.create_retriever(vector_store, index_cache.get_entry_path(index_key),
+                                              {'index_key': index_key, 'lineage_key': lineage_key})
             self.retriever_signal.emit(retriever)
             self.finish_run(self.embedding_model, Constants.NORMAL_STOP)
+        except IngestionStopped:
+            print(f"{FILE_INDEX_MESSAGE.INGESTION_STOPPED}")
+            self.finish_run(self.embedding_model, Constants.FORCE_STOP)
         except Exception as e:
             self.document_preprocess_error_signal.emit(str(e))
+        finally:
+            self.close_pdf_pool()
+
+    def get_pdf_pool(self):
+        with self.pdf_pool_lock:
+            if self.pdf_pool is None:
+                max_workers = Constants.INGESTION_MAX_WORKERS or os.cpu_count() or 1
+                self.pdf_pool = ParallelPyMuPDFLoader.create_pool(max_workers)
+            return self.pdf_pool
+
+    def close_pdf_pool(self):
+        with self.pdf_pool_lock:
+            if self.pdf_pool is not None:
+                self.pdf_pool.terminate()
+                self.pdf_pool.join()
+                self.pdf_pool = None
+
+    def create_retriever(self, vector_store, entry_path, metadata):
+        # metadata tags answers with the index they came from, see AnswerCache
+        search_kwargs = {'k': self.retrieve_docs}
+        # Indexes cached before the BM25 postings existed fall back to dense search
+        if self.hybrid and BM25Index.exists(entry_path):
+            return HybridRetriever(vectorstore=vector_store, search_kwargs=search_kwargs, metadata=metadata,
+                                   bm25_index=BM25Index.load(entry_path, self.mmap))
+        return vector_store.as_retriever(search_kwargs=search_kwargs, metadata=metadata)
+
+    @staticmethod
+    def evict_answers(lineage_key, index_key):
+        answer_cache = AnswerCache()
+        try:
+            evicted = answer_cache.evict_lineage(lineage_key, index_key)
+        finally:
+            answer_cache.close()
+        if evicted:
+            print(f"{FILE_INDEX_MESSAGE.ANSWER_CACHE_EVICTED} {evicted}")
+
+    def build_vector_store(self, file_paths, embedding, index_cache, index_key, lineage_key):
+        # Embed only the chunks the previous index of this selection does not have
+        previous_key = index_cache.get_latest_key(lineage_key)
+        previous_hashes = set(index_cache.load_chunk_hashes(previous_key) or []) if previous_key else set()
+        # Empty for quantized stores, their reused chunks are read from the embedding cache at full precision
+        previous_vectors = VectorStoreFactory.load_chunk_vectors(self.vector_store, index_cache, previous_key) \
+            if previous_key else {}
+
+        if self.streaming:
+            # Page-at-a-time pipeline, parsing overlaps with embedding and memory stays bounded
+            chunk_batches = self.stream_chunk_batches(file_paths)
+        else:
+            # Document load and split, fanned out over worker processes
+            chunk_batches = [list(self.load_and_split_documents(file_paths))]
+
+        # Length-bucketed batches behind the persistent cache, the store itself keeps the plain model for queries
+        bucketed_embedding = BucketedEmbeddings(embedding, self.embedding_batch_size, should_stop=self.is_force_stop)
+        cached_embedding = EmbeddingCache(bucketed_embedding, self.embedding_model)
+        try:
+            vector_store, bm25_index, direction_sum, chunk_hashes = self.index_chunk_batches(
+                chunk_batches, embedding, cached_embedding, previous_vectors, previous_hashes,
+                index_cache.prepare_entry(index_key))
+            print(f"{FILE_INDEX_MESSAGE.EMBEDDING_THROUGHPUT} {bucketed_embedding.get_throughput():.1f}")
+            print(f"{FILE_INDEX_MESSAGE.EMBEDDING_CACHE_STATS} {cached_embedding.get_stats()}")
+
+            quantization = None
+            if VectorStoreFactory.is_quantized(self.vector_store):
+                # Exact vectors are read back from the embedding cache, the build does not hold them
+                quantization = VectorStoreFactory.evaluate_quantization(vector_store, chunk_hashes, cached_embedding,
+                                                                        self.retrieve_docs)
+                recall = f"{quantization['recall']:.3f}" if quantization['recall'] is not None else "n/a"
+                print(f"{FILE_INDEX_MESSAGE.QUANTIZED_INDEX_STATS} {self.vector_store} "
+                      f"memory: {quantization['memory'] / (1024 * 1024):.1f} MB "
+                      f"(float32: {quantization['float32_memory'] / (1024 * 1024):.1f} MB), "
+                      f"recall@{self.retrieve_docs}: {recall}")
+        finally:
+            cached_embedding.close()
+
+        ann_index = VectorStoreFactory.build_ann_index(self.vector_store, vector_store)
+        if VectorStoreFactory.is_ann(self.vector_store):
+            print(f"{FILE_INDEX_MESSAGE.ANN_INDEX_BUILT} {ann_index} ({len(chunk_hashes)} chunks)")
+
+        # Off-topic reference distance and centroid of this index, see FastRouter
+        calibration = IndexCalibration.create(vector_store, embedding, direction_sum)
+
+        entry_path = index_cache.get_entry_path(index_key)
+        VectorStoreFactory.save_vector_store(self.vector_store, vector_store, entry_path)
+        bm25_index.save(entry_path)
+        index_cache.save_chunk_hashes(index_key, chunk_hashes)
+        index_cache.save_manifest(index_key, {
+            'file_paths': file_paths,
+            'embedding_model': self.embedding_model,
+            'chunk_size': self.chunk_size,
+            'chunk_overlap': self.chunk_overlap,
+            'vector_store': self.vector_store,
+            'chunks': len(chunk_hashes),
+            'quantization': quantization,
+            'ann_index': ann_index,
+            'calibration': calibration,
+        })
+        return vector_store
+
+    def index_chunk_batches(self, chunk_batches, embedding, chunk_embedding, previous_vectors, previous_hashes,
+                            entry_path):
+        # Only the hashes of the chunks stay in memory, the vectors of a batch are dropped once the store has them
+        vector_store = None
+        bm25_index = BM25Index()
+        deduplicator = ChunkDeduplicator(self.dedup_threshold) if self.dedup_threshold > 0 else None
+        # Chunk hash of each store row, in the order the rows are added
+        chunk_hashes = []
+        seen_hashes = set()
+        embedded_chunks = 0
+        reused_chunks = 0
+        # Running sum of the chunk directions, the calibration centroid
+        direction_sum = None
+        # Stores that cannot take batches cheaply are built once from every chunk, see DEFERRED_VECTOR_STORES
+        deferred = VectorStoreFactory.is_deferred(self.vector_store)
+        deferred_docs = []
+        deferred_vectors = []
+        for doc_splits in chunk_batches:
+            self.check_force_stop()
+            if deduplicator is not None:
+                doc_splits = deduplicator.filter(doc_splits)
+                if not doc_splits:
+                    continue
+            vectors, embedded, reused = self.embed_chunks(doc_splits, chunk_embedding, previous_vectors,
+                                                          previous_hashes, seen_hashes)
+            embedded_chunks += embedded
+            reused_chunks += reused
+            direction_sum = IndexCalibration.add_directions(direction_sum, vectors)
+            if deferred:
+                deferred_docs.extend(doc_splits)
+                deferred_vectors.append(vectors)
+            elif vector_store is None:
+                vector_store = VectorStoreFactory.create_vector_store(
+                    self.vector_store,
+                    documents=doc_splits,
+                    embedding=embedding,
+                    vectors=vectors,
+                    folder_path=entry_path,
+                )
+            else:
+                VectorStoreFactory.add_to_vector_store(self.vector_store, vector_store, doc_splits, vectors)
+            bm25_index.add_documents([doc.page_content for doc in doc_splits])
+            chunk_hashes.extend(doc.metadata['chunk_hash'] for doc in doc_splits)
+
+        if deferred and deferred_docs:
+            vector_store = VectorStoreFactory.create_vector_store(
+                self.vector_store,
+                documents=deferred_docs,
+                embedding=embedding,
+                vectors=np.concatenate(deferred_vectors),
+                folder_path=entry_path,
+            )
+
+        if vector_store is None:
+            raise ValueError(FILE_INDEX_MESSAGE.NO_CHUNKS)
+
+        if deduplicator is not None:
+            print(f"{FILE_INDEX_MESSAGE.CHUNKS_DEDUPLICATED} {deduplicator.collapsed} of {len(chunk_hashes) + deduplicator.collapsed}")
+
+        # Chunks that are no longer in the documents are dropped with their vectors
+        stale_chunks = len(previous_hashes - seen_hashes)
+        print(f"{FILE_INDEX_MESSAGE.INCREMENTAL_INDEX} embedded: {embedded_chunks}, "
+              f"reused: {reused_chunks}, removed: {stale_chunks}")
+        return vector_store, bm25_index, direction_sum, chunk_hashes
+
+    def embed_chunks(self, doc_splits, embedding, previous_vectors, previous_hashes, seen_hashes):
+        # Returns the float32 vectors of the batch in document order, with the counts of new and reused chunks
+        new_chunks = {}
+        embedded = 0
+        reused = 0
+        for doc in doc_splits:
+            chunk_hash = IndexCache.hash_chunk(doc.page_content)
+            doc.metadata['chunk_hash'] = chunk_hash
+            if chunk_hash not in seen_hashes:
+                seen_hashes.add(chunk_hash)
+                if chunk_hash in previous_hashes:
+                    reused += 1
+                else:
+                    embedded += 1
+            # A chunk seen in an earlier batch or reused from a quantized index comes from the embedding cache
+            if chunk_hash not in previous_vectors:
+                new_chunks.setdefault(chunk_hash, doc.page_content)
+
+        # Embedded in checkpoints, each one is in the embedding cache before the next starts
+        new_vectors = {}
+        chunk_hashes = list(new_chunks.keys())
+        for start in range(0, len(chunk_hashes), Constants.INGESTION_CHECKPOINT_SIZE):
+            self.check_force_stop()
+            checkpoint = chunk_hashes[start:start + Constants.INGESTION_CHECKPOINT_SIZE]
+            new_vectors.update(zip(checkpoint,
+                                   embedding.embed_documents([new_chunks[chunk_hash] for chunk_hash in checkpoint])))
+        vectors = np.stack([previous_vectors[doc.metadata['chunk_hash']]
+                            if doc.metadata['chunk_hash'] in previous_vectors
+                            else new_vectors[doc.metadata['chunk_hash']] for doc in doc_splits]).astype(np.float32)
+        return vectors, embedded, reused
+
+    def stream_chunk_batches(self, file_paths):
+        chunk_queue = queue.Queue(maxsize=Constants.INGESTION_STREAM_QUEUE_SIZE)
+        stop_event = threading.Event()
+
+        def put(item):
+            while not stop_event.is_set():
+                try:
+                    chunk_queue.put(item, timeout=Constants.INGESTION_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                text_splitter = DocumentFactory.create_text_splitter(self.chunk_size, self.chunk_overlap)
+                batch = []
+                for file_path in file_paths:
+                    loader = DocumentFactory.create_document_loader(file_path, self.get_pdf_pool)
+                    for page in loader.lazy_load():
+                        if self.force_stop:
+                            return
+                        batch.extend(text_splitter.split_documents([page]))
+                        if len(batch) >= Constants.INGESTION_STREAM_BATCH_SIZE:
+                            if not put(batch):
+                                return
+                            batch = []
+                if batch and not put(batch):
+                    return
+                put(None)
+            except Exception as e:
+                put(e)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                try:
+                    item = chunk_queue.get(timeout=Constants.INGESTION_POLL_INTERVAL)
+                except queue.Empty:
+                    self.check_force_stop()
+                    continue
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop_event.set()
+            producer.join()
+
+    def load_and_split_documents(self, file_paths):
+        if len(file_paths) == 1:
+            # Split page by page, so a stop request does not wait for the whole document
+            text_splitter = DocumentFactory.create_text_splitter(self.chunk_size, self.chunk_overlap)
+            loader = DocumentFactory.create_document_loader(file_paths[0], self.get_pdf_pool)
+            for page in loader.lazy_load():
+                self.check_force_stop()
+                yield from text_splitter.split_documents([page])
+            return
+
+        max_workers = min(len(file_paths), Constants.INGESTION_MAX_WORKERS or os.cpu_count() or 1)
+        load_and_split = partial(DocumentFactory.load_and_split,
+                                 chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+        # Leaving the pool terminates its workers, a stop request frees the CPU right away
+        with multiprocessing.get_context(Constants.INGESTION_START_METHOD).Pool(processes=max_workers) as pool:
+            # imap keeps the file order, so the merged chunk stream is deterministic
+            results = pool.imap(load_and_split, file_paths)
+            for _ in file_paths:
+                while True:
+                    self.check_force_stop()
+                    try:
+                        doc_splits = results.next(timeout=Constants.INGESTION_POLL_INTERVAL)
+                        break
+                    except multiprocessing.TimeoutError:
+                        continue
+                yield from doc_splits
 
     def set_force_stop(self, force_stop):
         self.force_stop = force_stop
 
+    def is_force_stop(self):
+        return self.force_stop
+
+    def check_force_stop(self):
+        if self.force_stop:
+            raise IngestionStopped()
+
     def finish_run(self, model, finish_reason):
         end_time = time.time()
         elapsed_time = end_time - self.start_time
@@ -73,29 +393,328 @@ class MyDocumentThread(QThread):
 
 class DocumentFactory:
     @staticmethod
-    def create_document_loader(file_path: str):
+    def expand_file_paths(paths):
+        file_paths = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for file in sorted(files):
+                        if file.lower().endswith(Constants.SUPPORTED_DOCUMENT_EXTENSIONS):
+                            file_paths.append(os.path.join(root, file))
+            elif os.path.isfile(path):
+                file_paths.append(path)
+            else:
+                raise FileNotFoundError(f"File not found: {path}")
+        # Drop duplicates from overlapping selections while keeping the selection order
+        return list(dict.fromkeys(file_paths))
+
+    @staticmethod
+    def load_and_split(file_path: str, chunk_size: int, chunk_overlap: int):
+        # Runs inside a worker process, so everything it needs is created here
+        loader = DocumentFactory.create_document_loader(file_path)
+        docs_list = loader.load()
+
+        text_splitter = DocumentFactory.create_text_splitter(chunk_size, chunk_overlap)
+        return text_splitter.split_documents(docs_list)
+
+    @staticmethod
+    def create_text_splitter(chunk_size: int, chunk_overlap: int):
+        return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
+
+    @staticmethod
+    def create_document_loader(file_path: str, get_pdf_pool=None):
         if file_path.endswith('.txt'):
             return TextLoader(file_path, encoding='utf-8')
         elif file_path.endswith('.pdf'):
-            return PyMuPDFLoader(file_path)
+            return ParallelPyMuPDFLoader(file_path, get_pool=get_pdf_pool)
         elif file_path.endswith('.docx'):
             return Docx2txtLoader(file_path)
         else:
             raise ValueError(UI.UNSUPPORTED_FILE_TYPE)
 
 
+class PrecomputedEmbeddings(Embeddings):
+    """
+    Hands vectors that were computed ahead of time to a vector store that can only embed by itself.
+    Queries are embedded by the wrapped model.
+    """
+
+    def __init__(self, vectors, embedding):
+        self.vectors = vectors
+        self.embedding = embedding
+
+    def set_vectors(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        if self.vectors is None or len(texts) != len(self.vectors):
+            raise ValueError(FILE_INDEX_MESSAGE.PRECOMPUTED_VECTORS_MISMATCH)
+        # The vectors are handed over once, the store keeps its own copy
+        vectors, self.vectors = self.vectors, None
+        return vectors
+
+    def embed_query(self, text):
+        return self.embedding.embed_query(text)
+
+
 class VectorStoreFactory:
+    FAISS_VECTOR_STORES = ("faiss", "faiss-hnsw", "faiss-ivf", "faiss-auto")
+    QUANTIZED_VECTOR_STORES = ("faiss-fp16", "faiss-int8", "faiss-binary")
+    ANN_VECTOR_STORES = ("faiss-hnsw", "faiss-ivf", "faiss-auto")
+    # SKLearn refits its neighbours on every add, the int8 quantizer and the binary index take their value ranges
+    # and mean from the first vectors
+    DEFERRED_VECTOR_STORES = ("sklearn", "faiss-int8", "faiss-binary")
+
     @staticmethod
-    def create_vector_store(vector_store: str, documents, embedding):
+    def create_vector_store(vector_store: str, documents, embedding, vectors=None, folder_path: str = None):
         if vector_store.lower() == "sklearn":
-            return SKLearnVectorStore.from_documents(
+            return MappedSKLearnVectorStore.from_documents(
                 documents=documents,
-                embedding=embedding,
+                embedding=embedding if vectors is None else PrecomputedEmbeddings(vectors, embedding),
+                persist_path=VectorStoreFactory.get_sklearn_persist_path(folder_path),
+                serializer="json",
             )
-        elif vector_store.lower() == "faiss":
+        elif vector_store.lower() in VectorStoreFactory.FAISS_VECTOR_STORES:
+            # Flat while chunks are added, build_ann_index swaps in the search index at the end
+            if vectors is not None:
+                return FAISS.from_embeddings(
+                    text_embeddings=zip([doc.page_content for doc in documents], vectors),
+                    embedding=embedding,
+                    metadatas=[doc.metadata for doc in documents],
+                )
             return FAISS.from_documents(
                 documents=documents,
                 embedding=embedding,
             )
+        elif vector_store.lower() in VectorStoreFactory.QUANTIZED_VECTOR_STORES:
+            if vectors is None:
+                vectors = embedding.embed_documents([doc.page_content for doc in documents])
+            index = VectorStoreFactory.create_quantized_index(vector_store, np.asarray(vectors, dtype=np.float32))
+            store = FAISS(embedding, index, InMemoryDocstore(), {})
+            VectorStoreFactory.add_to_vector_store(vector_store, store, documents, vectors)
+            return store
+        else:
+            raise ValueError(UI.UNSUPPORTED_VECTOR_STORE_TYPE)
+
+    @staticmethod
+    def create_quantized_index(vector_store: str, vectors):
+        d = vectors.shape[1]
+        if vector_store.lower() == "faiss-fp16":
+            return faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+        elif vector_store.lower() == "faiss-int8":
+            index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+            # Per dimension value ranges come from every chunk, the store is only created once all are embedded
+            index.train(vectors)
+            return index
+        elif vector_store.lower() == "faiss-binary":
+            # Centered on the mean of every chunk, the store is only created once all are embedded
+            return BinaryQuantizedIndex(d, mean=vectors.mean(axis=0))
+        else:
+            raise ValueError(UI.UNSUPPORTED_VECTOR_STORE_TYPE)
+
+    @staticmethod
+    def add_to_vector_store(vector_store: str, store, documents, vectors):
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata for doc in documents]
+        if vector_store.lower() == "sklearn":
+            store.embeddings.set_vectors(vectors)
+            store.add_texts(texts, metadatas=metadatas)
+        elif vector_store.lower() in VectorStoreFactory.FAISS_VECTOR_STORES + VectorStoreFactory.QUANTIZED_VECTOR_STORES:
+            store.add_embeddings(text_embeddings=zip(texts, vectors), metadatas=metadatas)
         else:
             raise ValueError(UI.UNSUPPORTED_VECTOR_STORE_TYPE)
+
+    @staticmethod
+    def save_vector_store(vector_store: str, store, folder_path: str):
+        if vector_store.lower() == "sklearn":
+            store.persist()
+        elif vector_store.lower() == "faiss-binary":
+            store.index.write(folder_path)
+            with open(os.path.join(folder_path, Constants.BINARY_INDEX_DOCSTORE), UI.FILE_WRITE_IN_BINARY_MODE) as file:
+                pickle.dump((store.docstore, store.index_to_docstore_id), file)
+        elif vector_store.lower() in VectorStoreFactory.FAISS_VECTOR_STORES + VectorStoreFactory.QUANTIZED_VECTOR_STORES:
+            store.save_local(folder_path)
+        else:
+            raise ValueError(UI.UNSUPPORTED_VECTOR_STORE_TYPE)
+
+    @staticmethod
+    def load_vector_store(vector_store: str, folder_path: str, embedding, mmap: bool = False, ann_index: str = None):
+        io_flags = VectorStoreFactory.get_io_flags(mmap, ann_index)
+        if vector_store.lower() == "sklearn":
+            return MappedSKLearnVectorStore(
+                embedding=embedding,
+                persist_path=VectorStoreFactory.get_sklearn_persist_path(folder_path),
+                serializer="json",
+                mmap=mmap,
+            )
+        elif vector_store.lower() == "faiss-binary":
+            # Written by save_vector_store, same as the FAISS pickle below
+            with open(os.path.join(folder_path, Constants.BINARY_INDEX_DOCSTORE), UI.FILE_READ_IN_BINARY_MODE) as file:
+                docstore, index_to_docstore_id = pickle.load(file)
+            return FAISS(embedding, BinaryQuantizedIndex.read(folder_path, io_flags), docstore, index_to_docstore_id)
+        elif vector_store.lower() in VectorStoreFactory.FAISS_VECTOR_STORES + VectorStoreFactory.QUANTIZED_VECTOR_STORES:
+            # The index files are written by save_vector_store, never taken from an outside source
+            return FAISS.load_local(folder_path, embedding, allow_dangerous_deserialization=True, io_flags=io_flags)
+        else:
+            raise ValueError(UI.UNSUPPORTED_VECTOR_STORE_TYPE)
+
+    @staticmethod
+    def load_chunk_vectors(vector_store: str, index_cache, key):
+        # Vectors of a cached entry by chunk hash, read from the store's own files instead of a second copy
+        chunk_hashes = index_cache.load_chunk_hashes(key)
+        if not chunk_hashes:
+            return {}
+        entry_path = index_cache.get_entry_path(key)
+        vectors_path = os.path.join(entry_path, Constants.INDEX_CACHE_CHUNK_VECTORS)
+        if os.path.isfile(vectors_path):
+            vectors = np.load(vectors_path, mmap_mode='r')
+        elif vector_store.lower() in VectorStoreFactory.FAISS_VECTOR_STORES:
+            # Lossless indexes only, fp16 and int8 would give back decoded vectors that lose more on every rebuild
+            index = faiss.read_index(os.path.join(entry_path, Constants.FAISS_INDEX_FILE))
+            ivf_index = faiss.try_extract_index_ivf(index)
+            if ivf_index is not None:
+                ivf_index.make_direct_map()
+            vectors = index.reconstruct_n(0, index.ntotal)
+        else:
+            return {}
+        if len(vectors) != len(chunk_hashes):
+            return {}
+        return {chunk_hash: np.asarray(vector, dtype=np.float32) for chunk_hash, vector in zip(chunk_hashes, vectors)}
+
+    @staticmethod
+    def select_ann_index(vector_store: str, chunk_count: int):
+        if vector_store.lower() == "faiss-hnsw":
+            return "hnsw"
+        elif vector_store.lower() == "faiss-ivf":
+            return "ivf"
+        elif vector_store.lower() == "faiss-auto":
+            if chunk_count < Constants.ANN_AUTO_FLAT_MAX:
+                return "flat"
+            elif chunk_count < Constants.ANN_AUTO_HNSW_MIN:
+                return "ivf"
+            return "hnsw"
+        return "flat"
+
+    @staticmethod
+    def build_ann_index(vector_store: str, store):
+        # Built once every chunk is in, so the index type and the IVF lists follow the final chunk count
+        chunk_count = store.index.ntotal if vector_store.lower() in VectorStoreFactory.ANN_VECTOR_STORES else 0
+        ann_index = VectorStoreFactory.select_ann_index(vector_store, chunk_count)
+        if ann_index == "flat":
+            return ann_index
+
+        vectors = store.index.reconstruct_n(0, chunk_count)
+        d = vectors.shape[1]
+        if ann_index == "hnsw":
+            index = faiss.IndexHNSWFlat(d, Constants.HNSW_M)
+            index.hnsw.efConstruction = Constants.HNSW_EF_CONSTRUCTION
+        else:
+            nlist = max(1, min(int(Constants.IVF_NLIST_FACTOR * math.sqrt(chunk_count)),
+                               chunk_count // Constants.IVF_MIN_POINTS_PER_LIST))
+            index = faiss.IndexIVFFlat(faiss.IndexFlatL2(d), d, nlist)
+            # Centroids are trained on a sample, not on the whole corpus
+            rng = np.random.default_rng(Constants.ANN_TRAIN_SEED)
+            sample_size = min(chunk_count, nlist * Constants.IVF_TRAIN_POINTS_PER_LIST)
+            index.train(vectors[rng.choice(chunk_count, sample_size, replace=False)])
+        index.add(vectors)
+        store.index = index
+        return ann_index
+
+    @staticmethod
+    def set_search_parameters(store, ef_search: int, nprobe: int):
+        index = getattr(store, 'index', None)
+        if hasattr(index, 'hnsw'):
+            index.hnsw.efSearch = ef_search
+        if hasattr(index, 'nprobe'):
+            index.nprobe = nprobe
+
+    @staticmethod
+    def get_io_flags(mmap: bool, ann_index: str = None):
+        if not mmap:
+            return 0
+        # IVF maps its inverted lists, flat, scalar quantizer and HNSW indexes map their codes
+        if ann_index == "ivf":
+            return faiss.IO_FLAG_MMAP
+        return getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+
+    @staticmethod
+    def evaluate_quantization(store, chunk_hashes, chunk_embedding, k):
+        # Memory of the in-memory codes against a float32 flat index, recall@k against exact search.
+        # Exact vectors come from the embedding cache a block at a time, the recall is n/a if some were evicted.
+        # Queries are chunks of the corpus, each one finds itself at distance 0, so it is left out of both
+        # result lists, searched one deeper for it
+        query_count = min(len(chunk_hashes), Constants.QUANTIZED_RECALL_QUERIES)
+        rng = np.random.default_rng(Constants.QUANTIZED_RECALL_SEED)
+        query_rows = rng.choice(len(chunk_hashes), query_count, replace=False)
+        search_k = min(k + 1, len(chunk_hashes))
+        queries = VectorStoreFactory.get_exact_vectors(chunk_embedding, [chunk_hashes[row] for row in query_rows])
+
+        exact_distances = np.full((query_count, 0), np.inf, dtype=np.float32)
+        exact_rows = np.empty((query_count, 0), dtype=np.int64)
+        for start in range(0, len(chunk_hashes), Constants.QUANTIZED_RECALL_BLOCK_SIZE):
+            if queries is None:
+                break
+            block = VectorStoreFactory.get_exact_vectors(
+                chunk_embedding, chunk_hashes[start:start + Constants.QUANTIZED_RECALL_BLOCK_SIZE])
+            if block is None:
+                queries = None
+                break
+            # Running top k over the blocks
+            block_distances, block_rows = faiss.knn(queries, block, min(search_k, len(block)))
+            distances = np.hstack([exact_distances, block_distances])
+            rows = np.hstack([exact_rows, block_rows + start])
+            best = np.argsort(distances, axis=1)[:, :search_k]
+            exact_distances = np.take_along_axis(distances, best, axis=1)
+            exact_rows = np.take_along_axis(rows, best, axis=1)
+
+        recall = None
+        if queries is not None:
+            _, quantized_rows = store.index.search(queries, search_k)
+            found = 0
+            expected = 0
+            for query_row, exact, quantized in zip(query_rows, exact_rows, quantized_rows):
+                query_hash = chunk_hashes[query_row]
+                exact_hashes = [chunk_hashes[row] for row in exact if chunk_hashes[row] != query_hash][:k]
+                quantized_hashes = [VectorStoreFactory.get_chunk_hash(store, row) for row in quantized if row >= 0]
+                quantized_hashes = [chunk_hash for chunk_hash in quantized_hashes if chunk_hash != query_hash][:k]
+                found += len(set(exact_hashes) & set(quantized_hashes))
+                expected += len(set(exact_hashes))
+            recall = found / expected if expected else 0.0
+
+        index_size = store.index.ntotal * store.index.code_size
+        return {
+            'memory': index_size,
+            'float32_memory': store.index.ntotal * store.index.d * np.dtype(np.float32).itemsize,
+            'recall': recall,
+        }
+
+    @staticmethod
+    def get_exact_vectors(chunk_embedding, chunk_hashes):
+        vectors = chunk_embedding.get_vectors(set(chunk_hashes))
+        if len(vectors) < len(set(chunk_hashes)):
+            return None
+        return np.stack([vectors[chunk_hash] for chunk_hash in chunk_hashes]).astype(np.float32)
+
+    @staticmethod
+    def get_chunk_hash(store, row):
+        return store.docstore.search(store.index_to_docstore_id[int(row)]).metadata.get('chunk_hash')
+
+    @staticmethod
+    def is_quantized(vector_store: str):
+        return vector_store.lower() in VectorStoreFactory.QUANTIZED_VECTOR_STORES
+
+    @staticmethod
+    def is_deferred(vector_store: str):
+        return vector_store.lower() in VectorStoreFactory.DEFERRED_VECTOR_STORES
+
+    @staticmethod
+    def is_ann(vector_store: str):
+        return vector_store.lower() in VectorStoreFactory.ANN_VECTOR_STORES
+
+    @staticmethod
+    def get_sklearn_persist_path(folder_path: str):
+        if folder_path is None:
+            return None
+        return os.path.join(folder_path, Constants.SKLEARN_PERSIST_FILE)
@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+from functools import partial
+
+import pymupdf
+from langchain_community.document_loaders import PyMuPDFLoader
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+from chat.model.PdfPageExtractor import PdfPageExtractor
+from util.Constants import Constants
+
+
+class ParallelPyMuPDFLoader(BaseLoader):
+    """
+    PDF loader that extracts page ranges in worker processes, each opening the file with PyMuPDF.
+    Pages come back in page order with the same metadata as PyMuPDFLoader.
+    Small PDFs, and PDFs loaded inside a worker process, are extracted serially.
+    get_pool returns a pool shared by every PDF of an ingestion, spawned workers are too costly to start per file.
+    Without it the loader starts a pool of its own.
+    """
+
+    def __init__(self, file_path: str, max_workers: int = None, get_pool=None):
+        self.file_path = file_path
+        self.max_workers = max_workers or Constants.INGESTION_MAX_WORKERS or os.cpu_count() or 1
+        self.get_pool = get_pool
+
+    @staticmethod
+    def create_pool(max_workers: int):
+        return multiprocessing.get_context(Constants.INGESTION_START_METHOD).Pool(processes=max_workers)
+
+    def lazy_load(self):
+        with pymupdf.open(self.file_path) as pdf:
+            page_count = pdf.page_count
+
+        pages = PyMuPDFLoader(self.file_path).lazy_load()
+        # Pool workers are daemonic and cannot start a pool of their own
+        if (page_count < Constants.PDF_PARALLEL_MIN_PAGES or self.max_workers < 2
+                or multiprocessing.current_process().daemon):
+            yield from pages
+            return
+
+        # The first page comes from PyMuPDFLoader, its metadata is shared by every other page
+        first_page = next(pages)
+        pages.close()
+        yield first_page
+
+        ranges = [(start, min(start + Constants.PDF_PAGES_PER_TASK, page_count))
+                  for start in range(1, page_count, Constants.PDF_PAGES_PER_TASK)]
+        if self.get_pool is not None:
+            yield from self.load_ranges(self.get_pool(), ranges, first_page)
+            return
+        with ParallelPyMuPDFLoader.create_pool(min(self.max_workers, len(ranges))) as pool:
+            yield from self.load_ranges(pool, ranges, first_page)
+
+    def load_ranges(self, pool, ranges, first_page):
+        # imap keeps the range order, so pages are yielded in page order
+        extract_pages = partial(PdfPageExtractor.extract_pages, self.file_path)
+        for (start, _), texts in zip(ranges, pool.imap(extract_pages, ranges)):
+            for offset, text in enumerate(texts):
+                yield Document(page_content=text, metadata={**first_page.metadata, 'page': start + offset})
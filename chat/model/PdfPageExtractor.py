@@ -0,0 +1,15 @@
+import pymupdf
+
+
+class PdfPageExtractor:
+    """
+    Page text extraction for the PDF worker processes.
+    Only PyMuPDF is imported here, so a worker unpickling a task does not load LangChain.
+    """
+
+    @staticmethod
+    def extract_pages(file_path: str, page_range):
+        # Runs inside a worker process
+        start, end = page_range
+        with pymupdf.open(file_path) as pdf:
+            return [pdf[number].get_text().strip() for number in range(start, end)]
@@ -4,7 +4,7 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QScrollArea, QSizePolicy, QSplitter, QComboBox, QLabel, QTabWidget, \
     QGroupBox, QFormLayout, QPushButton, QHBoxLayout, QApplication, QTextEdit, QSpinBox, QListWidget, \
-    QFileDialog, QMessageBox
+    QFileDialog, QMessageBox, QCheckBox
 
 from chat.view.ChatHistory import ChatHistory
 from chat.view.ChatWidget import ChatWidget
@@ -31,6 +31,7 @@ class ChatView(QWidget):
         self._current_chat_llm = Utility.get_settings_value(section="AI_Provider", prop="llm",
                                                             default="Ollama", save=True)
         self.found_text_positions = []
+        self.stream_widget = None
 
         self.initialize_ui()
 
@@ -221,6 +222,7 @@ class ChatView(QWidget):
         self.tabs = QTabWidget()
         self.tabs.addTab(self.create_prompt_tabcontent("Router", False), "Router")
         self.tabs.addTab(self.create_prompt_tabcontent("Document", True), "Document")
+        self.tabs.addTab(self.create_prompt_tabcontent("DocumentBatch", True), "Document Batch")
         self.tabs.addTab(self.create_prompt_tabcontent("RAG", False), "RAG")
         self.tabs.addTab(self.create_prompt_tabcontent("Hallucination", True), "Hallucination")
         self.tabs.addTab(self.create_prompt_tabcontent("Answer", True), "Answer")
@@ -314,6 +316,66 @@ class ChatView(QWidget):
     def vector_store_changed(self, value, name):
         self._settings.setValue(f"{name}_Model_Parameter/vector_store", value)
 
+    def ef_search_changed(self, value, name):
+        self._settings.setValue(f"{name}_Model_Parameter/ef_search", value)
+
+    def nprobe_changed(self, value, name):
+        self._settings.setValue(f"{name}_Model_Parameter/nprobe", value)
+
+    def dedup_threshold_changed(self, value, name):
+        self._settings.setValue(f"{name}_Model_Parameter/dedup_threshold", value)
+
+    def embedding_batch_changed(self, value, name):
+        self._settings.setValue(f"{name}_Model_Parameter/embedding_batch", value)
+
+    def streaming_changed(self, checked, name):
+        if checked:
+            self._settings.setValue(f"{name}_Model_Parameter/streaming", 'True')
+        else:
+            self._settings.setValue(f"{name}_Model_Parameter/streaming", 'False')
+
+    def mmap_changed(self, checked, name):
+        if checked:
+            self._settings.setValue(f"{name}_Model_Parameter/mmap", 'True')
+        else:
+            self._settings.setValue(f"{name}_Model_Parameter/mmap", 'False')
+
+    def hybrid_changed(self, checked, name):
+        if checked:
+            self._settings.setValue(f"{name}_Model_Parameter/hybrid", 'True')
+        else:
+            self._settings.setValue(f"{name}_Model_Parameter/hybrid", 'False')
+
+    def answer_cache_threshold_changed(self, value, name):
+        self._settings.setValue(f"{name}_Model_Parameter/answer_cache_threshold", value)
+
+    def batch_grading_changed(self, checked, name):
+        if checked:
+            self._settings.setValue(f"{name}_Model_Parameter/batch_grading", 'True')
+        else:
+            self._settings.setValue(f"{name}_Model_Parameter/batch_grading", 'False')
+
+    def fast_router_changed(self, checked, name):
+        if checked:
+            self._settings.setValue(f"{name}_Model_Parameter/fast_router", 'True')
+        else:
+            self._settings.setValue(f"{name}_Model_Parameter/fast_router", 'False')
+
+    def fast_router_margin_changed(self, value, name):
+        self._settings.setValue(f"{name}_Model_Parameter/fast_router_margin", value)
+
+    def score_gating_changed(self, checked, name):
+        if checked:
+            self._settings.setValue(f"{name}_Model_Parameter/score_gating", 'True')
+        else:
+            self._settings.setValue(f"{name}_Model_Parameter/score_gating", 'False')
+
+    def score_gating_accept_changed(self, value, name):
+        self._settings.setValue(f"{name}_Model_Parameter/score_gating_accept", value)
+
+    def score_gating_reject_changed(self, value, name):
+        self._settings.setValue(f"{name}_Model_Parameter/score_gating_reject", value)
+
     def on_toggle(self):
         sender = self.sender()
         if sender.isChecked():
@@ -387,6 +449,167 @@ class ChatView(QWidget):
         retrieve_docsSpinBox.valueChanged.connect(lambda value: self.retrieve_docs_changed(value, name))
         langchain_setting_layout.addRow('Retrieve Docs', retrieve_docsSpinBox)
 
+        ef_searchSpinBox = QSpinBox()
+        ef_searchSpinBox.setObjectName(f"{name}_ef_searchSpinBox")
+        ef_searchSpinBox.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        ef_searchSpinBox.setRange(16, 1024)
+        ef_searchSpinBox.setAccelerated(True)
+        ef_searchSpinBox.setSingleStep(16)
+        ef_searchSpinBox.setValue(
+            int(
+                Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="ef_search",
+                                           default=str(Constants.HNSW_EF_SEARCH), save=True)))
+        ef_searchSpinBox.valueChanged.connect(lambda value: self.ef_search_changed(value, name))
+        langchain_setting_layout.addRow('HNSW efSearch', ef_searchSpinBox)
+
+        nprobeSpinBox = QSpinBox()
+        nprobeSpinBox.setObjectName(f"{name}_nprobeSpinBox")
+        nprobeSpinBox.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        nprobeSpinBox.setRange(1, 1024)
+        nprobeSpinBox.setAccelerated(True)
+        nprobeSpinBox.setSingleStep(1)
+        nprobeSpinBox.setValue(
+            int(
+                Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="nprobe",
+                                           default=str(Constants.IVF_NPROBE), save=True)))
+        nprobeSpinBox.valueChanged.connect(lambda value: self.nprobe_changed(value, name))
+        langchain_setting_layout.addRow('IVF nprobe', nprobeSpinBox)
+
+        embedding_batchSpinBox = QSpinBox()
+        embedding_batchSpinBox.setObjectName(f"{name}_embedding_batchSpinBox")
+        embedding_batchSpinBox.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        embedding_batchSpinBox.setRange(0, Constants.EMBEDDING_MAX_BATCH_SIZE)
+        embedding_batchSpinBox.setSpecialValueText("Auto")
+        embedding_batchSpinBox.setAccelerated(True)
+        embedding_batchSpinBox.setSingleStep(8)
+        embedding_batchSpinBox.setValue(
+            int(
+                Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="embedding_batch",
+                                           default="0", save=True)))
+        embedding_batchSpinBox.valueChanged.connect(lambda value: self.embedding_batch_changed(value, name))
+        langchain_setting_layout.addRow('Embedding Batch', embedding_batchSpinBox)
+
+        dedup_thresholdSpinBox = QSpinBox()
+        dedup_thresholdSpinBox.setObjectName(f"{name}_dedup_thresholdSpinBox")
+        dedup_thresholdSpinBox.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        dedup_thresholdSpinBox.setRange(0, 100)
+        dedup_thresholdSpinBox.setSuffix("%")
+        dedup_thresholdSpinBox.setSpecialValueText("Off")
+        dedup_thresholdSpinBox.setAccelerated(True)
+        dedup_thresholdSpinBox.setSingleStep(5)
+        dedup_thresholdSpinBox.setValue(
+            int(
+                Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="dedup_threshold",
+                                           default=str(int(Constants.DEDUP_THRESHOLD * 100)), save=True)))
+        dedup_thresholdSpinBox.valueChanged.connect(lambda value: self.dedup_threshold_changed(value, name))
+        langchain_setting_layout.addRow('Dedup Similarity', dedup_thresholdSpinBox)
+
+        streaming_CheckBox = QCheckBox()
+        streaming_CheckBox.setObjectName(f"{name}_streamingCheckBox")
+        streaming_CheckBox.setChecked(
+            Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="streaming",
+                                       default="False", save=True) == 'True')
+        streaming_CheckBox.toggled.connect(lambda checked: self.streaming_changed(checked, name))
+        langchain_setting_layout.addRow('Streaming', streaming_CheckBox)
+
+        mmap_CheckBox = QCheckBox()
+        mmap_CheckBox.setObjectName(f"{name}_mmapCheckBox")
+        mmap_CheckBox.setChecked(
+            Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="mmap",
+                                       default=str(Constants.INDEX_MMAP), save=True) == 'True')
+        mmap_CheckBox.toggled.connect(lambda checked: self.mmap_changed(checked, name))
+        langchain_setting_layout.addRow('Memory Map Index', mmap_CheckBox)
+
+        hybrid_CheckBox = QCheckBox()
+        hybrid_CheckBox.setObjectName(f"{name}_hybridCheckBox")
+        hybrid_CheckBox.setChecked(
+            Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="hybrid",
+                                       default=str(Constants.HYBRID_SEARCH), save=True) == 'True')
+        hybrid_CheckBox.toggled.connect(lambda checked: self.hybrid_changed(checked, name))
+        langchain_setting_layout.addRow('Hybrid Search', hybrid_CheckBox)
+
+        batch_grading_CheckBox = QCheckBox()
+        batch_grading_CheckBox.setObjectName(f"{name}_batch_gradingCheckBox")
+        batch_grading_CheckBox.setChecked(
+            Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="batch_grading",
+                                       default=str(Constants.BATCH_GRADING), save=True) == 'True')
+        batch_grading_CheckBox.toggled.connect(lambda checked: self.batch_grading_changed(checked, name))
+        langchain_setting_layout.addRow('Batch Grading', batch_grading_CheckBox)
+
+        fast_router_CheckBox = QCheckBox()
+        fast_router_CheckBox.setObjectName(f"{name}_fast_routerCheckBox")
+        fast_router_CheckBox.setChecked(
+            Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="fast_router",
+                                       default=str(Constants.FAST_ROUTER), save=True) == 'True')
+        fast_router_CheckBox.toggled.connect(lambda checked: self.fast_router_changed(checked, name))
+        langchain_setting_layout.addRow('Fast Router', fast_router_CheckBox)
+
+        fast_router_marginSpinBox = QSpinBox()
+        fast_router_marginSpinBox.setObjectName(f"{name}_fast_router_marginSpinBox")
+        fast_router_marginSpinBox.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        fast_router_marginSpinBox.setRange(0, 100)
+        fast_router_marginSpinBox.setSuffix("%")
+        fast_router_marginSpinBox.setAccelerated(True)
+        fast_router_marginSpinBox.setSingleStep(5)
+        fast_router_marginSpinBox.setValue(
+            int(
+                Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="fast_router_margin",
+                                           default=str(int(Constants.FAST_ROUTER_MARGIN * 100)), save=True)))
+        fast_router_marginSpinBox.valueChanged.connect(lambda value: self.fast_router_margin_changed(value, name))
+        langchain_setting_layout.addRow('Fast Router Margin', fast_router_marginSpinBox)
+
+        score_gating_CheckBox = QCheckBox()
+        score_gating_CheckBox.setObjectName(f"{name}_score_gatingCheckBox")
+        score_gating_CheckBox.setChecked(
+            Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="score_gating",
+                                       default=str(Constants.SCORE_GATING), save=True) == 'True')
+        score_gating_CheckBox.toggled.connect(lambda checked: self.score_gating_changed(checked, name))
+        langchain_setting_layout.addRow('Score Gating', score_gating_CheckBox)
+
+        score_gating_acceptSpinBox = QSpinBox()
+        score_gating_acceptSpinBox.setObjectName(f"{name}_score_gating_acceptSpinBox")
+        score_gating_acceptSpinBox.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        score_gating_acceptSpinBox.setRange(0, 200)
+        score_gating_acceptSpinBox.setSuffix("%")
+        score_gating_acceptSpinBox.setAccelerated(True)
+        score_gating_acceptSpinBox.setSingleStep(5)
+        score_gating_acceptSpinBox.setValue(
+            int(
+                Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="score_gating_accept",
+                                           default=str(int(Constants.SCORE_GATING_ACCEPT * 100)), save=True)))
+        score_gating_acceptSpinBox.valueChanged.connect(lambda value: self.score_gating_accept_changed(value, name))
+        langchain_setting_layout.addRow('Gating Accept Distance', score_gating_acceptSpinBox)
+
+        score_gating_rejectSpinBox = QSpinBox()
+        score_gating_rejectSpinBox.setObjectName(f"{name}_score_gating_rejectSpinBox")
+        score_gating_rejectSpinBox.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        score_gating_rejectSpinBox.setRange(0, 200)
+        score_gating_rejectSpinBox.setSuffix("%")
+        score_gating_rejectSpinBox.setAccelerated(True)
+        score_gating_rejectSpinBox.setSingleStep(5)
+        score_gating_rejectSpinBox.setValue(
+            int(
+                Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="score_gating_reject",
+                                           default=str(int(Constants.SCORE_GATING_REJECT * 100)), save=True)))
+        score_gating_rejectSpinBox.valueChanged.connect(lambda value: self.score_gating_reject_changed(value, name))
+        langchain_setting_layout.addRow('Gating Reject Distance', score_gating_rejectSpinBox)
+
+        answer_cache_thresholdSpinBox = QSpinBox()
+        answer_cache_thresholdSpinBox.setObjectName(f"{name}_answer_cache_thresholdSpinBox")
+        answer_cache_thresholdSpinBox.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        answer_cache_thresholdSpinBox.setRange(0, 100)
+        answer_cache_thresholdSpinBox.setSuffix("%")
+        answer_cache_thresholdSpinBox.setSpecialValueText("Off")
+        answer_cache_thresholdSpinBox.setAccelerated(True)
+        answer_cache_thresholdSpinBox.setSingleStep(1)
+        answer_cache_thresholdSpinBox.setValue(
+            int(
+                Utility.get_settings_value(section=f"{name}_Model_Parameter", prop="answer_cache_threshold",
+                                           default=str(int(Constants.ANSWER_CACHE_THRESHOLD * 100)), save=True)))
+        answer_cache_thresholdSpinBox.valueChanged.connect(
+            lambda value: self.answer_cache_threshold_changed(value, name))
+        langchain_setting_layout.addRow('Answer Cache Similarity', answer_cache_thresholdSpinBox)
+
         langchain_setting_group.setLayout(langchain_setting_layout)
         layout_main.addWidget(langchain_setting_group)
 
@@ -421,11 +644,15 @@ class ChatView(QWidget):
         select_button = QPushButton(QIcon(Utility.get_icon_path('ico', 'documents-text.png')), "File")
         select_button.setObjectName(f"{name}_SelectButton")
 
+        select_folder_button = QPushButton(QIcon(Utility.get_icon_path('ico', 'documents-text.png')), "Folder")
+        select_folder_button.setObjectName(f"{name}_SelectFolderButton")
+
         delete_button = QPushButton(QIcon(Utility.get_icon_path('ico', 'folder--minus.png')), "Remove")
         delete_button.setObjectName(f"{name}_DeleteButton")
         delete_button.setEnabled(False)
 
         buttons_layout.addWidget(select_button)
+        buttons_layout.addWidget(select_folder_button)
         buttons_layout.addWidget(delete_button)
 
         document_list_layout.addLayout(buttons_layout)
@@ -449,6 +676,7 @@ class ChatView(QWidget):
         document_list_layout.addLayout(submit_layout)
 
         select_button.clicked.connect(partial(self.select_files, name))
+        select_folder_button.clicked.connect(partial(self.select_folder, name))
         delete_button.clicked.connect(partial(self.delete_file, name))
         submit_button.clicked.connect(partial(self.submit_file, name))
 
@@ -549,6 +777,13 @@ class ChatView(QWidget):
             fileListWidget.addItem(file)
         self.update_submit_status(llm)
 
+    def select_folder(self, llm):
+        fileListWidget = self.findChild(QListWidget, f"{llm}_FileList")
+        selected_folder = QFileDialog.getExistingDirectory(self, UI.SELECT_DOCUMENT_FOLDER)
+        if selected_folder:
+            fileListWidget.addItem(selected_folder)
+        self.update_submit_status(llm)
+
     def delete_file(self, llm):
         fileListWidget = self.findChild(QListWidget, f"{llm}_FileList")
         for item in fileListWidget.selectedItems():
@@ -577,7 +812,7 @@ class ChatView(QWidget):
         file_filter = UI.TEXT_PDF_WORD_FILTER
 
         file_dialog = QFileDialog()
-        file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
+        file_dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
         file_dialog.setNameFilter(file_filter)
 
         if file_dialog.exec():
@@ -600,19 +835,24 @@ class ChatView(QWidget):
             'chunk_size': self.get_chunking_size(),
             'chunk_overlap': self.get_chunk_overlap(),
             'retrieve_docs': self.get_retrieve_docs(),
+            'streaming': self.get_streaming(),
+            'embedding_batch_size': self.get_embedding_batch_size(),
+            'ef_search': self.get_ef_search(),
+            'nprobe': self.get_nprobe(),
+            'mmap': self.get_mmap(),
+            'hybrid': self.get_hybrid(),
+            'dedup_threshold': self.get_dedup_threshold(),
         }
-        input_file_path = self.get_selected_file(llm)
-        args['file_path'] = input_file_path
-        if not self.validate_input(input_file_path):
+        input_file_paths = self.get_selected_files(llm)
+        args['file_paths'] = input_file_paths
+        if not self.validate_input(input_file_paths):
             return
-        if input_file_path:
+        if input_file_paths:
             self.submitted_file_signal.emit(args)
 
-    def get_selected_file(self, llm):
+    def get_selected_files(self, llm):
         fileListWidget = self.findChild(QListWidget, f"{llm}_FileList")
-        if fileListWidget.count() == 0:
-            return
-        return fileListWidget.item(0).text()
+        return [fileListWidget.item(i).text() for i in range(fileListWidget.count())]
 
     def show_warning(self, message):
         QMessageBox.warning(self, UI.WARNING_TITLE, message)
@@ -752,9 +992,30 @@ class ChatView(QWidget):
         self.ai_answer_scroll_area.verticalScrollBar().setSliderPosition(max_val)
 
     def update_ui(self, image_data, response_text):
+        # The graders passed, the streamed answer is replaced by the committed one
+        self.retract_stream()
         ai_answer = ImageWidget(ChatType.AI, image_data, response_text)
         self.result_layout.addWidget(ai_answer)
 
+    def start_stream(self):
+        # Every generation attempt starts over
+        if self.stream_widget is None:
+            self.stream_widget = ChatWidget(ChatType.AI, "")
+            self.result_layout.addWidget(self.stream_widget)
+        else:
+            self.stream_widget.reset_text()
+        self.stream_widget.set_model_name(UI.PROVISIONAL_ANSWER)
+
+    def append_stream(self, token):
+        if self.stream_widget is not None:
+            self.stream_widget.add_text(token)
+
+    def retract_stream(self):
+        if self.stream_widget is not None:
+            self.result_layout.removeWidget(self.stream_widget)
+            self.stream_widget.deleteLater()
+            self.stream_widget = None
+
     def update_ui_finish(self, model, finish_reason, elapsed_time, stream):
         chatWidget = self.get_last_ai_widget()
         self.stop_widget.setVisible(False)
@@ -781,9 +1042,17 @@ class ChatView(QWidget):
         self.prompt_text.setEnabled(False)
 
     def finish_chat(self):
+        # An answer that was never committed did not pass the graders
+        self.retract_stream()
         self.prompt_text.setEnabled(True)
         self.prompt_text.setFocus()
 
+    def start_document(self):
+        self.stop_widget.setVisible(True)
+
+    def finish_document(self):
+        self.stop_widget.setVisible(False)
+
     def clear_prompt(self):
         self.prompt_text.clear()
 
@@ -820,6 +1089,11 @@ class ChatView(QWidget):
         prompt_list['doc_grader_instruction'] = self.findChild(QTextEdit,
                                                                'Document_current_instruction').toPlainText()
 
+        prompt_list['doc_grader_batch_prompt'] = self.findChild(QTextEdit,
+                                                                'DocumentBatch_current_prompt').toPlainText()
+        prompt_list['doc_grader_batch_instruction'] = self.findChild(QTextEdit,
+                                                                     'DocumentBatch_current_instruction').toPlainText()
+
         prompt_list['hallucination_grader_prompt'] = self.findChild(QTextEdit,
                                                                     'Hallucination_current_prompt').toPlainText()
         prompt_list['hallucination_grader_instruction'] = self.findChild(QTextEdit,
@@ -839,6 +1113,7 @@ class ChatView(QWidget):
                 widget = item.widget()
                 if widget is not None:
                     widget.deleteLater()
+        self.stream_widget = None
 
     def force_stop(self):
         self.stop_signal.emit()
@@ -857,6 +1132,48 @@ class ChatView(QWidget):
     def get_chunk_overlap(self):
         return self.findChild(QSpinBox, f'{self._current_chat_llm}_chunk_overlapSpinBox').value()
 
+    def get_ef_search(self):
+        return self.findChild(QSpinBox, f'{self._current_chat_llm}_ef_searchSpinBox').value()
+
+    def get_nprobe(self):
+        return self.findChild(QSpinBox, f'{self._current_chat_llm}_nprobeSpinBox').value()
+
+    def get_dedup_threshold(self):
+        return self.findChild(QSpinBox, f'{self._current_chat_llm}_dedup_thresholdSpinBox').value() / 100
+
+    def get_embedding_batch_size(self):
+        return self.findChild(QSpinBox, f'{self._current_chat_llm}_embedding_batchSpinBox').value()
+
+    def get_streaming(self):
+        return self.findChild(QCheckBox, f'{self._current_chat_llm}_streamingCheckBox').isChecked()
+
+    def get_mmap(self):
+        return self.findChild(QCheckBox, f'{self._current_chat_llm}_mmapCheckBox').isChecked()
+
+    def get_hybrid(self):
+        return self.findChild(QCheckBox, f'{self._current_chat_llm}_hybridCheckBox').isChecked()
+
+    def get_answer_cache_threshold(self):
+        return self.findChild(QSpinBox, f'{self._current_chat_llm}_answer_cache_thresholdSpinBox').value() / 100
+
+    def get_batch_grading(self):
+        return self.findChild(QCheckBox, f'{self._current_chat_llm}_batch_gradingCheckBox').isChecked()
+
+    def get_fast_router(self):
+        return self.findChild(QCheckBox, f'{self._current_chat_llm}_fast_routerCheckBox').isChecked()
+
+    def get_fast_router_margin(self):
+        return self.findChild(QSpinBox, f'{self._current_chat_llm}_fast_router_marginSpinBox').value() / 100
+
+    def get_score_gating(self):
+        return self.findChild(QCheckBox, f'{self._current_chat_llm}_score_gatingCheckBox').isChecked()
+
+    def get_score_gating_accept(self):
+        return self.findChild(QSpinBox, f'{self._current_chat_llm}_score_gating_acceptSpinBox').value() / 100
+
+    def get_score_gating_reject(self):
+        return self.findChild(QSpinBox, f'{self._current_chat_llm}_score_gating_rejectSpinBox').value() / 100
+
     def get_vector_store(self):
         return self.findChild(QComboBox, f'{self._current_chat_llm}_vector_storeComboBox').currentText()
 
@@ -206,6 +206,10 @@ class ChatWidget(QWidget):
         self.text_result.append(text)
         self.user_text.setText(self.user_text.text() + text)
 
+    def reset_text(self):
+        self.text_result = []
+        self.user_text.setText("")
+
     def apply_style(self):
         formatted_text = self.format_code_snippet(self.get_original_text())
         self.user_text.setText(formatted_text)
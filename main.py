@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 from os import path
 
@@ -13,6 +14,7 @@ from util.AppInfoDialog import AppInfoDialog
 from util.Constants import Constants, MainWidgetIndex, UI, AIProviderName
 from util.DataManager import DataManager
 from util.GlobalSetting import GlobalSetting
+from util.IndexCache import IndexCache
 from util.SettingsManager import SettingsManager
 from util.Utility import Utility
 from util.VerticalLine import VerticalLine
@@ -41,6 +43,9 @@ class MainWindow(QMainWindow):
         DataManager.initialize_database()
         self._database = DataManager.get_database()
 
+        # Indexes replaced in the previous session, no retriever has opened them yet
+        IndexCache().remove_stale_entries()
+
     def initialize_variables(self):
         self.progress_bar = None
         self.current_llm = None
@@ -285,6 +290,9 @@ class MainWindow(QMainWindow):
 
 
 if __name__ == '__main__':
+    # Document ingestion runs loaders in worker processes, which needs this in a frozen app
+    multiprocessing.freeze_support()
+
     app = QApplication(sys.argv)
     app.setStyle(QStyleFactory.create(Constants.FUSION))
 
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from util.Constants import Constants, DATABASE_MESSAGE
+
+
+class AnswerCache:
+    """
+    Semantic cache of accepted answers, looked up by the cosine similarity of the question embeddings.
+    Entries are tagged with the index they were answered from and the model (llm and prompts) that answered them.
+    Answers expire after a TTL, and answers of an index that a re-ingestion replaced are evicted.
+    """
+
+    def __init__(self, db_filename=None, ttl=Constants.ANSWER_CACHE_TTL, max_entries=Constants.ANSWER_CACHE_MAX_ENTRIES):
+        self.db_filename = db_filename or AnswerCache.get_default_path()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_filename, check_same_thread=False)
+        self.create_table()
+
+    @staticmethod
+    def get_default_path():
+        # Next to the chat history database
+        database_dir = os.path.dirname(os.path.abspath(Constants.DATABASE_NAME))
+        return os.path.join(database_dir, Constants.ANSWER_CACHE_DATABASE_NAME)
+
+    @staticmethod
+    def normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def create_table(self):
+        try:
+            self.connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS {Constants.ANSWER_CACHE_TABLE}
+                (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    lineage_key TEXT NOT NULL,
+                    index_key TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    answer TEXT NOT NULL,
+                    image_data TEXT,
+                    created REAL NOT NULL DEFAULT 0,
+                    last_used REAL NOT NULL
+                )
+                """)
+            columns = [row[1] for row in self.connection.execute(f"PRAGMA table_info({Constants.ANSWER_CACHE_TABLE})")]
+            if 'created' not in columns:
+                # Tables from before the TTL, their answers count as expired
+                self.connection.execute(
+                    f"ALTER TABLE {Constants.ANSWER_CACHE_TABLE} ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            self.connection.execute(f"""
+                CREATE INDEX IF NOT EXISTS {Constants.ANSWER_CACHE_TABLE}_index_model
+                ON {Constants.ANSWER_CACHE_TABLE} (index_key, model)
+                """)
+            self.connection.commit()
+        except sqlite3.Error as e:
+            print(f"{DATABASE_MESSAGE.DATABASE_ANSWER_CACHE_CREATE_TABLE_ERROR} {e}")
+
+    def get_answer(self, index_key, model, vector, threshold):
+        # Returns (answer, image_data, similarity) of the closest earlier question, or None below the threshold
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT id, vector, answer, image_data FROM {Constants.ANSWER_CACHE_TABLE} "
+                f"WHERE index_key = ? AND model = ? AND created > ?",
+                (index_key, model, time.time() - self.ttl)).fetchall()
+            if not rows:
+                return None
+            vectors = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            similarities = vectors @ self.normalize(vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] < threshold:
+                return None
+            self.connection.execute(f"UPDATE {Constants.ANSWER_CACHE_TABLE} SET last_used = ? WHERE id = ?",
+                                    (time.time(), rows[best][0]))
+            self.connection.commit()
+        return rows[best][2], rows[best][3], float(similarities[best])
+
+    def put_answer(self, lineage_key, index_key, model, question, vector, answer, image_data):
+        with self.lock:
+            self.connection.execute(
+                f"INSERT INTO {Constants.ANSWER_CACHE_TABLE} "
+                f"(lineage_key, index_key, model, question, vector, answer, image_data, created, last_used) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (lineage_key, index_key, model, question, self.normalize(vector).tobytes(), answer, image_data,
+                 time.time(), time.time()))
+            # Keep the most recently used answers of this index and model, expired ones are dropped first
+            self.connection.execute(
+                f"DELETE FROM {Constants.ANSWER_CACHE_TABLE} WHERE created <= ?", (time.time() - self.ttl,))
+            self.connection.execute(
+                f"DELETE FROM {Constants.ANSWER_CACHE_TABLE} WHERE id IN "
+                f"(SELECT id FROM {Constants.ANSWER_CACHE_TABLE} WHERE index_key = ? AND model = ? "
+                f"ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (index_key, model, self.max_entries))
+            self.connection.commit()
+
+    def evict_lineage(self, lineage_key, index_key):
+        # The same selection and settings now point at a different index, its earlier answers may be stale
+        with self.lock:
+            evicted = self.connection.execute(
+                f"DELETE FROM {Constants.ANSWER_CACHE_TABLE} WHERE lineage_key = ? AND index_key != ?",
+                (lineage_key, index_key)).rowcount
+            self.connection.commit()
+        return evicted
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
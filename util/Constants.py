@@ -47,6 +47,201 @@ class Constants:
 
     NEW_CHAT = "New Chat"
 
+    # Document ingestion
+    SUPPORTED_DOCUMENT_EXTENSIONS = ('.txt', '.pdf', '.docx')
+    INGESTION_MAX_WORKERS = None
+    # Workers are started fresh, forking the threaded Qt / torch process can copy a held lock into a worker
+    INGESTION_START_METHOD = "spawn"
+    INGESTION_STREAM_BATCH_SIZE = 256
+    INGESTION_STREAM_QUEUE_SIZE = 4
+    INGESTION_POLL_INTERVAL = 0.2
+    INGESTION_CHECKPOINT_SIZE = 1024
+    PDF_PARALLEL_MIN_PAGES = 64
+    PDF_PAGES_PER_TASK = 16
+
+    # Index cache
+    INDEX_CACHE_DIR = "index_cache"
+    INDEX_CACHE_MANIFEST = "manifest.json"
+    INDEX_CACHE_LINEAGE = "lineage.json"
+    INDEX_CACHE_STALE_ENTRIES = "stale_entries.json"
+    INDEX_CACHE_CHUNK_HASHES = "chunk_hashes.json"
+    # The one float copy of an entry's vectors in store row order, written only by stores that search on floats
+    INDEX_CACHE_CHUNK_VECTORS = "chunk_vectors.npy"
+    INDEX_CACHE_HASH_BLOCK_SIZE = 1024 * 1024
+    SKLEARN_PERSIST_FILE = "sklearn.json"
+    # Entries saved before the store shared chunk_vectors.npy
+    SKLEARN_VECTORS_FILE = "sklearn_vectors.npy"
+    FAISS_INDEX_FILE = "index.faiss"
+    INDEX_CACHE_FILE_HASHES = "file_hashes.json"
+    INDEX_MMAP = True
+
+    # Quantized vector stores
+    QUANTIZED_RESCORE_FACTOR = 4
+    QUANTIZED_RECALL_QUERIES = 64
+    QUANTIZED_RECALL_SEED = 0
+    QUANTIZED_RECALL_BLOCK_SIZE = 65536
+    BINARY_INDEX_FILE = "index.faissb"
+    # Entries saved before the index shared chunk_vectors.npy
+    BINARY_INDEX_VECTORS = "vectors.npy"
+    BINARY_INDEX_MEAN = "mean.npy"
+    BINARY_INDEX_DOCSTORE = "index.pkl"
+
+    # Approximate nearest neighbour indexes
+    ANN_AUTO_FLAT_MAX = 20000
+    ANN_AUTO_HNSW_MIN = 1000000
+    ANN_TRAIN_SEED = 0
+    HNSW_M = 32
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 64
+    IVF_NLIST_FACTOR = 4
+    IVF_MIN_POINTS_PER_LIST = 39
+    IVF_TRAIN_POINTS_PER_LIST = 64
+    IVF_NPROBE = 16
+
+    # Near-duplicate chunk elimination
+    # Off by default, near-duplicates across files are often intended, e.g. the same clause in two contracts
+    DEDUP_THRESHOLD = 0.0
+    DEDUP_NUM_PERM = 128
+    DEDUP_SHINGLE_SIZE = 3
+    DEDUP_SEED = 0
+    DEDUP_SOURCE_KEYS = ("source", "page")
+
+    # Hybrid retrieval
+    HYBRID_SEARCH = True
+    HYBRID_FETCH_FACTOR = 4
+    HYBRID_DEFAULT_K = 4
+    RRF_K = 60
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    BM25_TERMS_FILE = "bm25_terms.json"
+    BM25_OFFSETS_FILE = "bm25_offsets.npy"
+    BM25_DOC_IDS_FILE = "bm25_doc_ids.npy"
+    BM25_TERM_FREQS_FILE = "bm25_term_freqs.npy"
+    BM25_DOC_LENGTHS_FILE = "bm25_doc_lengths.npy"
+
+    # Workflow, matches Ollama's default OLLAMA_NUM_PARALLEL
+    GRADER_MAX_PARALLEL = 4
+    BATCH_GRADING = False
+
+    # Semantic answer cache
+    ANSWER_CACHE_DATABASE_NAME = "answer_cache.db"
+    ANSWER_CACHE_TABLE = "answer_cache"
+    # Off by default, a raw cosine cutoff means something different for every embedding model
+    ANSWER_CACHE_THRESHOLD = 0.0
+    ANSWER_CACHE_TTL = 24 * 60 * 60
+    ANSWER_CACHE_MAX_ENTRIES = 500
+
+    # Router and grader call memo
+    LLM_MEMO_CACHE = True
+    LLM_MEMO_DATABASE_NAME = "llm_memo_cache.db"
+    LLM_MEMO_TABLE = "llm_memo"
+    LLM_MEMO_TTL = 7 * 24 * 60 * 60
+    LLM_MEMO_MAX_ENTRIES = 20000
+
+    # Embedding router, the LLM router decides only when the distance is too close to call.
+    # The margin is a fraction of the index's calibrated off-topic distance, see IndexCalibration
+    FAST_ROUTER = False
+    FAST_ROUTER_MARGIN = 0.3
+    FAST_ROUTER_WEBSEARCH_EXEMPLARS = (
+        "What is the latest news today?",
+        "What is the weather forecast for tomorrow?",
+        "What is the current stock price of the company?",
+        "Who won the game last night?",
+        "What happened in the world this week?",
+        "When is the next public holiday?",
+        "What are the current exchange rates?",
+        "Which movies are showing in theaters now?",
+    )
+
+    # Document grading by retrieval score, the LLM grades only the scores in between
+    # Distances are fractions of the index's calibrated off-topic distance, see IndexCalibration
+    SCORE_GATING = False
+    SCORE_GATING_ACCEPT = 0.5
+    SCORE_GATING_REJECT = 1.0
+    SCORE_GATING_ENOUGH_DOCS = 3
+
+    # Web search
+    WEB_SEARCH_BACKEND_TAVILY = "Tavily"
+    WEB_SEARCH_BACKEND_LOCAL = "Local"
+    WEB_SEARCH_BACKEND = WEB_SEARCH_BACKEND_TAVILY
+    WEB_SEARCH_CACHE_TTL = 60 * 60
+    WEB_SEARCH_CACHE_MAX_ENTRIES = 256
+    LOCAL_WEB_SEARCH_FILE = "web_search_stub.json"
+    LOCAL_WEB_SEARCH_URL = "local://search"
+    LOCAL_WEB_SEARCH_DELAY = 0.0
+
+    # Workflow graph image
+    GRAPH_IMAGE_SHOW_PATH = True
+    GRAPH_IMAGE_NODE_WIDTH = 150
+    GRAPH_IMAGE_NODE_HEIGHT = 40
+    GRAPH_IMAGE_GAP = 60
+    GRAPH_IMAGE_EDGE_OFFSET = 6
+    GRAPH_IMAGE_LOOP_RADIUS = 24
+    GRAPH_IMAGE_LABEL_MARGIN = 100
+    GRAPH_IMAGE_ARROW_SIZE = 10
+    GRAPH_IMAGE_DASH_LENGTH = 6
+    GRAPH_IMAGE_FONT_SIZE = 13
+    GRAPH_IMAGE_BACKGROUND = "#ffffff"
+    GRAPH_IMAGE_NODE_FILL = "#f2f0ff"
+    GRAPH_IMAGE_EDGE_COLOR = "#555555"
+    GRAPH_IMAGE_TEXT_COLOR = "#000000"
+    GRAPH_IMAGE_LABEL_COLOR = "#777777"
+    GRAPH_IMAGE_PATH_COLOR = "#2e9e2e"
+    GRAPH_IMAGE_PATH_FILL = "#d8fabe"
+
+    # Ingestion benchmark
+    BENCHMARK_RUNNING = "Benchmarking"
+    BENCHMARK_TEMP_PREFIX = "myaiagent_benchmark_"
+    BENCHMARK_POLL_INTERVAL = 1.0
+    BENCHMARK_PROCESS_EXITED = "Benchmark process exited without a result, exit code"
+    BENCHMARK_FILES = 20
+    BENCHMARK_WORDS_PER_FILE = 20000
+    BENCHMARK_FILE_TYPES = ['txt', 'pdf', 'docx']
+    BENCHMARK_VECTOR_STORES = ['SKLearn', 'FAISS']
+    BENCHMARK_CHUNK_SIZES = [500, 1000, 2000]
+    BENCHMARK_CHUNK_OVERLAP = 100
+    BENCHMARK_SEED = 0
+    BENCHMARK_VOCABULARY_SIZE = 5000
+    BENCHMARK_WORDS_PER_PARAGRAPH = 80
+    BENCHMARK_PARAGRAPHS_PER_PAGE = 6
+    BENCHMARK_DOCX_CONTENT_TYPES = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '</Types>')
+    BENCHMARK_DOCX_RELATIONSHIPS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="word/document.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>')
+    BENCHMARK_DOCX_DOCUMENT = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        '<w:body>{body}</w:body></w:document>')
+
+    # Embedding model pool
+    EMBEDDING_POOL_MAX_MODELS = 2
+    EMBEDDING_POOL_MAX_MEMORY = 4 * 1024 * 1024 * 1024
+
+    # Embedding batches, sized by a tuned token budget unless a fixed batch size is set
+    EMBEDDING_MAX_BATCH_SIZE = 256
+    EMBEDDING_TOKEN_BUDGET_START = 4096
+    EMBEDDING_TOKEN_BUDGET_MAX = 65536
+    EMBEDDING_TUNE_MIN_GAIN = 1.05
+    EMBEDDING_MAX_BATCH_SECONDS = 1.0
+    EMBEDDING_CHARS_PER_TOKEN = 4
+
+    # Embedding cache
+    EMBEDDING_CACHE_DATABASE_NAME = "embedding_cache.db"
+    EMBEDDING_CACHE_TABLE = "embedding_cache"
+    EMBEDDING_CACHE_MAX_SIZE = 2 * 1024 * 1024 * 1024
+    EMBEDDING_CACHE_EVICT_RATIO = 0.9
+    EMBEDDING_CACHE_QUERY_BATCH = 500
+
     # For splitter
     FILE_TYPE_LIST = [
         "text",
@@ -57,6 +252,12 @@ class Constants:
     VECTOR_STORE_LIST = [
         "SKLearn",
         "FAISS",
+        "FAISS-FP16",
+        "FAISS-INT8",
+        "FAISS-Binary",
+        "FAISS-HNSW",
+        "FAISS-IVF",
+        "FAISS-Auto",
     ]
 
     RESPONSE_FORMAT_B64_JSON = "b64_json"
@@ -83,6 +284,11 @@ class LANGCHAIN_CONSTANT:
     UNABLE_TO_FIND_AN_ANSWER = "Unable to find an answer that matches the question. Please ask a new question or adjust the Max Retry value."
     ENTER_YOUR_PROMPT = "Enter your prompt"
     DOCUMENT_PROCESS_FINISHED = "Document process finished"
+    DOCUMENT_PROCESS_STOPPED = "Document process stopped"
+    DOCUMENT_PROCESS_RESUME = "Run the document process again to resume, chunks embedded so far are not embedded again."
+    OLLAMA_NUM_PARALLEL = "OLLAMA_NUM_PARALLEL"
+    ANSWER_CACHE_ROUTE = "answer cache"
+    BATCH_GRADING_FALLBACK = "Batch grading did not return one binary_score per document, grading each document"
 
     def __setattr__(self, name, value):
         if name in self.__dict__:
@@ -106,6 +312,8 @@ class UI:
     CHAT = "Chat"
     CHAT_TIP = "Chat"
     CHAT_LIST = "Chat List"
+    LOCAL_WEB_SEARCH_NO_RESULT = "No local web search results for:"
+    PROVISIONAL_ANSWER = "Generating, not yet checked by the graders..."
 
     SETTING = "Setting"
     SETTING_TIP = "Setting"
@@ -135,6 +343,7 @@ class UI:
     ERROR = "Error"
 
     FILE_READ_IN_BINARY_MODE = 'rb'
+    FILE_WRITE_IN_BINARY_MODE = 'wb'
     UTF_8 = "utf-8"
 
     FILE_COPY_SUCCESS = "Files saved successfully!"
@@ -168,6 +377,8 @@ class UI:
     WARNING_TITLE_NO_PROMPT_MESSAGE = "Enter your prompt."
     UNSUPPORTED_VECTOR_STORE_TYPE = "Unsupported vector store type."
 
+    SELECT_DOCUMENT_FOLDER = "Select Document Folder"
+
     TEXT_PDF_WORD_FILTER = "Doc (*.txt *.pdf *.docx)"
     TEXT_FILTER = "Text (*.txt)"
     PDF_FILTER = "PDF (*.pdf)"
@@ -239,6 +450,23 @@ class FILE_INDEX_MESSAGE:
     THREAD_FINISHED = "Indexing File : Thread has been finished"
     INVALID_CREATION_TYPE = "Invalid creation type: "
     UNEXPECTED_ERROR = "An unexpected error occurred: "
+    INDEX_CACHE_HIT = "Indexing File : Loaded cached index"
+    INDEX_CACHE_MISS = "Indexing File : No cached index, building"
+    INDEX_CACHE_REMOVED = "Indexing File : Removed cached index"
+    INDEX_CACHE_REMOVE_FAILED = "Indexing File : Could not remove cached index, retried on next start"
+    INCREMENTAL_INDEX = "Indexing File : Incremental update"
+    PRECOMPUTED_VECTORS_MISMATCH = "Precomputed vectors do not match the documents"
+    NO_CHUNKS = "No text could be extracted from the selected documents"
+    EMBEDDING_MODEL_LOADED = "Embedding Pool : Loaded"
+    EMBEDDING_MODEL_EVICTED = "Embedding Pool : Evicted"
+    EMBEDDING_BATCH_TUNED = "Embedding : Tuned batch token budget"
+    EMBEDDING_THROUGHPUT = "Embedding : Throughput (chunks/sec)"
+    EMBEDDING_CACHE_STATS = "Embedding Cache :"
+    QUANTIZED_INDEX_STATS = "Quantized Index :"
+    ANN_INDEX_BUILT = "Indexing File : Search index"
+    CHUNKS_DEDUPLICATED = "Indexing File : Near-duplicate chunks collapsed"
+    INGESTION_STOPPED = "Indexing File : Stopped, embedded chunks are kept for the next run"
+    ANSWER_CACHE_EVICTED = "Answer Cache : Evicted answers of the replaced index"
 
     def __setattr__(self, name, value):
         if name in self.__dict__:
@@ -251,6 +479,14 @@ class MODEL_MESSAGE:
     MODEL_UNSUPPORTED_TYPE = "Unsupported model type"
     THREAD_RUNNING = "Previous thread is still running!"
     THREAD_FINISHED = "LangchainWorkflowModel Thread has been finished"
+    WORKFLOW_ENGINE_CREATED = "Workflow engine created for"
+    ANSWER_CACHE_HIT = "Answer Cache : Hit, similarity"
+    LLM_MEMO_HIT = "LLM Memo : Hit"
+    FAST_ROUTER_ROUTED = "Fast Router : Routed to"
+    FAST_ROUTER_FALLBACK = "Fast Router : Low confidence, using the LLM router"
+    SCORE_GATING = "Score Gating :"
+    WEB_SEARCH_CACHE_HIT = "Web Search Cache : Hit"
+    WEB_SEARCH_COALESCED = "Web Search Cache : Waiting for the same search in flight"
     INVALID_CREATION_TYPE = "Invalid creation type: "
     UNEXPECTED_ERROR = "An unexpected error occurred: "
     AUTHENTICATION_FAILED_OPENAI = "Authentication failed. The OpenAI API key is not valid."
@@ -285,6 +521,10 @@ class DATABASE_MESSAGE:
     DATABASE_DELETE_TABLE_SUCCESS = "Successfully deleted table: "
     DATABASE_EXECUTE_QUERY_ERROR = "Failed to execute query: "
 
+    DATABASE_EMBEDDING_CACHE_CREATE_TABLE_ERROR = "Failed to create embedding cache table: "
+    DATABASE_ANSWER_CACHE_CREATE_TABLE_ERROR = "Failed to create answer cache table: "
+    DATABASE_LLM_MEMO_CREATE_TABLE_ERROR = "Failed to create llm memo table: "
+
     DATABASE_FAILED_OPEN = "Failed to open database."
     DATABASE_ENABLE_FOREIGN_KEY = "Failed to enable foreign key: "
     DATABASE_PRAGMA_FOREIGN_KEYS_ON = "PRAGMA foreign_keys = ON;"
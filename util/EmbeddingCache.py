@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from util.Constants import Constants, UI, DATABASE_MESSAGE
+
+
+class EmbeddingCache(Embeddings):
+    """
+    Persistent embedding cache shared across documents and sessions.
+    Vectors are stored as float32 BLOBs keyed by (embedding model, sha256 of the chunk text),
+    and the least recently used entries are evicted once the cache grows past its size limit.
+    embed_documents returns a float32 array with one row per text, not lists of Python floats.
+    """
+
+    def __init__(self, embedding, model_name, db_filename=None, max_size=Constants.EMBEDDING_CACHE_MAX_SIZE):
+        self.embedding = embedding
+        self.model_name = model_name
+        self.db_filename = db_filename or EmbeddingCache.get_default_path()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_filename, check_same_thread=False)
+        self.create_table()
+        self.total_size = self.connection.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM {Constants.EMBEDDING_CACHE_TABLE}").fetchone()[0]
+
+    @staticmethod
+    def get_default_path():
+        # Next to the chat history database
+        database_dir = os.path.dirname(os.path.abspath(Constants.DATABASE_NAME))
+        return os.path.join(database_dir, Constants.EMBEDDING_CACHE_DATABASE_NAME)
+
+    @staticmethod
+    def hash_text(text):
+        return hashlib.sha256(text.encode(UI.UTF_8)).hexdigest()
+
+    def create_table(self):
+        try:
+            self.connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS {Constants.EMBEDDING_CACHE_TABLE}
+                (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+                """)
+            self.connection.execute(f"""
+                CREATE INDEX IF NOT EXISTS {Constants.EMBEDDING_CACHE_TABLE}_last_used
+                ON {Constants.EMBEDDING_CACHE_TABLE} (last_used)
+                """)
+            self.connection.commit()
+        except sqlite3.Error as e:
+            print(f"{DATABASE_MESSAGE.DATABASE_EMBEDDING_CACHE_CREATE_TABLE_ERROR} {e}")
+
+    def embed_documents(self, texts):
+        text_hashes = [self.hash_text(text) for text in texts]
+        cached_vectors = self.get_vectors(set(text_hashes))
+
+        missing = {}
+        for text_hash, text in zip(text_hashes, texts):
+            if text_hash not in cached_vectors and text_hash not in missing:
+                missing[text_hash] = text
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            new_vectors = self.embedding.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), new_vectors))
+            self.put_vectors(new_vectors)
+            cached_vectors.update(new_vectors)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([np.asarray(cached_vectors[text_hash], dtype=np.float32) for text_hash in text_hashes])
+
+    def embed_query(self, text):
+        return self.embedding.embed_query(text)
+
+    def get_vectors(self, text_hashes):
+        vectors = {}
+        text_hashes = list(text_hashes)
+        now = time.time()
+        with self.lock:
+            for start in range(0, len(text_hashes), Constants.EMBEDDING_CACHE_QUERY_BATCH):
+                batch = text_hashes[start:start + Constants.EMBEDDING_CACHE_QUERY_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT text_hash, vector FROM {Constants.EMBEDDING_CACHE_TABLE} "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_name] + batch).fetchall()
+                for text_hash, vector in rows:
+                    vectors[text_hash] = np.frombuffer(vector, dtype=np.float32)
+            if vectors:
+                self.connection.executemany(
+                    f"UPDATE {Constants.EMBEDDING_CACHE_TABLE} SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, self.model_name, text_hash) for text_hash in vectors])
+                self.connection.commit()
+        return vectors
+
+    def put_vectors(self, vectors):
+        now = time.time()
+        rows = []
+        for text_hash, vector in vectors.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((self.model_name, text_hash, blob, len(blob), now))
+        with self.lock:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {Constants.EMBEDDING_CACHE_TABLE} "
+                f"(model, text_hash, vector, size, last_used) VALUES (?, ?, ?, ?, ?)", rows)
+            self.connection.commit()
+            self.total_size += sum(row[3] for row in rows)
+            self.evict()
+
+    def evict(self):
+        if self.total_size <= self.max_size:
+            return
+        count, size = self.connection.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {Constants.EMBEDDING_CACHE_TABLE}").fetchone()
+        if count == 0:
+            self.total_size = 0
+            return
+        # Drop the least recently used rows down to the low watermark
+        target_size = self.max_size * Constants.EMBEDDING_CACHE_EVICT_RATIO
+        evict_count = max(1, int((size - target_size) / (size / count)))
+        self.connection.execute(
+            f"DELETE FROM {Constants.EMBEDDING_CACHE_TABLE} WHERE rowid IN "
+            f"(SELECT rowid FROM {Constants.EMBEDDING_CACHE_TABLE} ORDER BY last_used LIMIT ?)", (evict_count,))
+        self.connection.commit()
+        self.total_size = self.connection.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM {Constants.EMBEDDING_CACHE_TABLE}").fetchone()[0]
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': self.total_size,
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
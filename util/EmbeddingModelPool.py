@@ -0,0 +1,107 @@
+import gc
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from util.Constants import Constants, FILE_INDEX_MESSAGE
+
+
+class EmbeddingModelPool:
+    """
+    Process-wide pool of loaded embedding models keyed by (model name, device, encode kwargs).
+    Models are kept warm between ingestions and query-time embeddings and evicted in LRU order
+    once the pool grows past its model count or memory cap.
+    """
+    __models = OrderedDict()
+    __lock = threading.RLock()
+    __max_models = Constants.EMBEDDING_POOL_MAX_MODELS
+    __max_memory = Constants.EMBEDDING_POOL_MAX_MEMORY
+
+    @classmethod
+    def get_embeddings(cls, model_name: str, device: str, encode_kwargs: dict = None) -> HuggingFaceEmbeddings:
+        # Batches are formed by BucketedEmbeddings, so encode should not split them again,
+        # unless the caller sets its own batch size
+        encode_kwargs = {'batch_size': Constants.EMBEDDING_MAX_BATCH_SIZE, **(encode_kwargs or {})}
+        key = (model_name, device, json.dumps(encode_kwargs, sort_keys=True, default=str))
+        with cls.__lock:
+            if key in cls.__models:
+                cls.__models.move_to_end(key)
+                entry = cls.__models[key]
+                entry['hits'] += 1
+                return entry['embeddings']
+
+            start_time = time.time()
+            model_kwargs = {"device": device, 'trust_remote_code': True}
+            embeddings = HuggingFaceEmbeddings(
+                model_name=model_name, model_kwargs=model_kwargs, encode_kwargs=encode_kwargs
+            )
+            entry = {
+                'embeddings': embeddings,
+                'load_time': time.time() - start_time,
+                'resident_size': cls.get_resident_size(embeddings),
+                'hits': 0,
+            }
+            cls.__models[key] = entry
+            print(f"{FILE_INDEX_MESSAGE.EMBEDDING_MODEL_LOADED} {model_name} ({device}) "
+                  f"{entry['load_time']:.2f}s, {entry['resident_size'] / (1024 * 1024):.1f} MB")
+            cls.evict(keep=key)
+            return embeddings
+
+    @classmethod
+    def evict(cls, keep=None):
+        with cls.__lock:
+            while len(cls.__models) > 1 and (len(cls.__models) > cls.__max_models
+                                             or cls.get_total_resident_size() > cls.__max_memory):
+                key = next(iter(cls.__models))
+                if key == keep:
+                    break
+                cls.__models.pop(key)
+                print(f"{FILE_INDEX_MESSAGE.EMBEDDING_MODEL_EVICTED} {key[0]} ({key[1]})")
+            # Weights of evicted models are released once no retriever holds them anymore
+            gc.collect()
+
+    @classmethod
+    def clear(cls):
+        with cls.__lock:
+            cls.__models.clear()
+            gc.collect()
+
+    @classmethod
+    def set_limits(cls, max_models: int = None, max_memory: int = None):
+        with cls.__lock:
+            if max_models is not None:
+                cls.__max_models = max_models
+            if max_memory is not None:
+                cls.__max_memory = max_memory
+            cls.evict()
+
+    @classmethod
+    def get_total_resident_size(cls):
+        return sum(entry['resident_size'] for entry in cls.__models.values())
+
+    @classmethod
+    def get_stats(cls):
+        with cls.__lock:
+            return [
+                {
+                    'model_name': model_name,
+                    'device': device,
+                    'encode_kwargs': json.loads(encode_kwargs),
+                    'load_time': entry['load_time'],
+                    'resident_size': entry['resident_size'],
+                    'hits': entry['hits'],
+                }
+                for (model_name, device, encode_kwargs), entry in cls.__models.items()
+            ]
+
+    @staticmethod
+    def get_resident_size(embeddings):
+        client = getattr(embeddings, '_client', None)
+        if client is None or not hasattr(client, 'parameters'):
+            return 0
+        size = sum(parameter.numel() * parameter.element_size() for parameter in client.parameters())
+        size += sum(buffer.numel() * buffer.element_size() for buffer in client.buffers())
+        return size
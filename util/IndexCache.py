@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import shutil
+
+from util.Constants import Constants, UI, FILE_INDEX_MESSAGE
+
+
+class IndexCache:
+    """
+    Content-addressed on-disk cache of vector stores.
+    An entry is keyed by the document hashes plus every setting that changes the resulting index.
+    """
+
+    def __init__(self, cache_dir=Constants.INDEX_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_file(file_path):
+        sha256 = hashlib.sha256()
+        with open(file_path, UI.FILE_READ_IN_BINARY_MODE) as file:
+            for block in iter(lambda: file.read(Constants.INDEX_CACHE_HASH_BLOCK_SIZE), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def hash_dict(values):
+        return hashlib.sha256(json.dumps(values, sort_keys=True).encode(UI.UTF_8)).hexdigest()
+
+    def get_file_hashes(self, file_paths):
+        # Unchanged files (same size and mtime) are not read again, so a cache hit does not scale with corpus size
+        hashes_path = os.path.join(self.cache_dir, Constants.INDEX_CACHE_FILE_HASHES)
+        known_hashes = {}
+        if os.path.isfile(hashes_path):
+            with open(hashes_path, 'r', encoding=UI.UTF_8) as file:
+                known_hashes = json.load(file)
+
+        file_hashes = []
+        updated = False
+        for file_path in file_paths:
+            path = os.path.abspath(file_path)
+            stat = os.stat(path)
+            known = known_hashes.get(path)
+            if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                file_hashes.append(known[2])
+                continue
+            file_hash = self.hash_file(path)
+            known_hashes[path] = [stat.st_size, stat.st_mtime_ns, file_hash]
+            file_hashes.append(file_hash)
+            updated = True
+
+        if updated:
+            temp_path = hashes_path + '.tmp'
+            with open(temp_path, 'w', encoding=UI.UTF_8) as file:
+                json.dump(known_hashes, file)
+            os.replace(temp_path, hashes_path)
+        return file_hashes
+
+    def make_key(self, file_paths, embedding_model, chunk_size, chunk_overlap, vector_store, dedup_threshold=0.0):
+        return self.hash_dict({
+            'file_hashes': sorted(self.get_file_hashes(file_paths)),
+            'embedding_model': embedding_model,
+            'chunk_size': chunk_size,
+            'chunk_overlap': chunk_overlap,
+            'vector_store': vector_store.lower(),
+            'dedup_threshold': dedup_threshold,
+        })
+
+    def make_lineage_key(self, paths, embedding_model, chunk_size, chunk_overlap, vector_store, dedup_threshold=0.0):
+        # Same selection and settings, any content: the previous index of a changed document
+        return self.hash_dict({
+            'paths': sorted(os.path.abspath(path) for path in paths),
+            'embedding_model': embedding_model,
+            'chunk_size': chunk_size,
+            'chunk_overlap': chunk_overlap,
+            'vector_store': vector_store.lower(),
+            'dedup_threshold': dedup_threshold,
+        })
+
+    @staticmethod
+    def hash_chunk(text):
+        return hashlib.sha256(text.encode(UI.UTF_8)).hexdigest()
+
+    def get_entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get_manifest_path(self, key):
+        return os.path.join(self.get_entry_path(key), Constants.INDEX_CACHE_MANIFEST)
+
+    def contains(self, key):
+        return os.path.isfile(self.get_manifest_path(key))
+
+    def load_manifest(self, key):
+        with open(self.get_manifest_path(key), 'r', encoding=UI.UTF_8) as file:
+            return json.load(file)
+
+    def save_manifest(self, key, manifest):
+        # The manifest is written last and atomically, so its presence marks a complete entry.
+        manifest_path = self.get_manifest_path(key)
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding=UI.UTF_8) as file:
+            json.dump(manifest, file)
+        os.replace(temp_path, manifest_path)
+
+    def save_chunk_hashes(self, key, chunk_hashes):
+        # Chunk hash of every store row, the vectors themselves stay in the store's files
+        with open(os.path.join(self.get_entry_path(key), Constants.INDEX_CACHE_CHUNK_HASHES), 'w',
+                  encoding=UI.UTF_8) as file:
+            json.dump(chunk_hashes, file)
+
+    def load_chunk_hashes(self, key):
+        hashes_path = os.path.join(self.get_entry_path(key), Constants.INDEX_CACHE_CHUNK_HASHES)
+        if not self.contains(key) or not os.path.isfile(hashes_path):
+            return None
+        with open(hashes_path, 'r', encoding=UI.UTF_8) as file:
+            return json.load(file)
+
+    def get_lineage_path(self):
+        return os.path.join(self.cache_dir, Constants.INDEX_CACHE_LINEAGE)
+
+    def load_lineage(self):
+        if not os.path.isfile(self.get_lineage_path()):
+            return {}
+        with open(self.get_lineage_path(), 'r', encoding=UI.UTF_8) as file:
+            return json.load(file)
+
+    def get_latest_key(self, lineage_key):
+        return self.load_lineage().get(lineage_key)
+
+    def set_latest_key(self, lineage_key, key):
+        lineage = self.load_lineage()
+        previous_key = lineage.get(lineage_key)
+        lineage[lineage_key] = key
+        temp_path = self.get_lineage_path() + '.tmp'
+        with open(temp_path, 'w', encoding=UI.UTF_8) as file:
+            json.dump(lineage, file)
+        os.replace(temp_path, self.get_lineage_path())
+
+        # The older index of this selection is stale once the new one is complete, but a retriever or
+        # router may still have its files mapped, so it is only removed on the next start
+        if previous_key and previous_key != key and previous_key not in lineage.values():
+            self.mark_stale(previous_key)
+
+    def get_stale_entries_path(self):
+        return os.path.join(self.cache_dir, Constants.INDEX_CACHE_STALE_ENTRIES)
+
+    def load_stale_entries(self):
+        if not os.path.isfile(self.get_stale_entries_path()):
+            return []
+        with open(self.get_stale_entries_path(), 'r', encoding=UI.UTF_8) as file:
+            return json.load(file)
+
+    def save_stale_entries(self, keys):
+        temp_path = self.get_stale_entries_path() + '.tmp'
+        with open(temp_path, 'w', encoding=UI.UTF_8) as file:
+            json.dump(keys, file)
+        os.replace(temp_path, self.get_stale_entries_path())
+
+    def mark_stale(self, key):
+        keys = self.load_stale_entries()
+        if key not in keys:
+            self.save_stale_entries(keys + [key])
+
+    def remove_stale_entries(self):
+        # Called before any index is loaded, nothing has the stale files open
+        keys = self.load_stale_entries()
+        if not keys:
+            return
+        current_keys = set(self.load_lineage().values())
+        remaining = []
+        for key in keys:
+            if key in current_keys:
+                # Became the latest index of a selection again
+                continue
+            try:
+                self.remove(key)
+            except OSError as e:
+                print(f"{FILE_INDEX_MESSAGE.INDEX_CACHE_REMOVE_FAILED} {key}: {e}")
+                remaining.append(key)
+        self.save_stale_entries(remaining)
+
+    def prepare_entry(self, key):
+        entry_path = self.get_entry_path(key)
+        if os.path.isdir(entry_path) and not self.contains(key):
+            # Leftover of an interrupted build
+            shutil.rmtree(entry_path)
+        os.makedirs(entry_path, exist_ok=True)
+        return entry_path
+
+    def remove(self, key):
+        entry_path = self.get_entry_path(key)
+        if os.path.isdir(entry_path):
+            shutil.rmtree(entry_path)
+            print(f"{FILE_INDEX_MESSAGE.INDEX_CACHE_REMOVED} {key}")
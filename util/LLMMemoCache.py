@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+
+from util.Constants import Constants, UI, DATABASE_MESSAGE, MODEL_MESSAGE
+
+
+class LLMMemoCache:
+    """
+    Persistent memo of chat model calls that are deterministic for a prompt (temperature 0), such as the router
+    and the graders. Responses are keyed by sha256 of (model, format, temperature, messages), expire after a TTL,
+    and the least recently used entries are evicted past the size limit.
+    Wraps the chat model and is called the same way, invoke(messages).
+    """
+
+    def __init__(self, llm, db_filename=None, ttl=Constants.LLM_MEMO_TTL, max_entries=Constants.LLM_MEMO_MAX_ENTRIES):
+        self.llm = llm
+        self.db_filename = db_filename or LLMMemoCache.get_default_path()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_filename, check_same_thread=False)
+        self.create_table()
+
+    @staticmethod
+    def get_default_path():
+        # Next to the chat history database
+        database_dir = os.path.dirname(os.path.abspath(Constants.DATABASE_NAME))
+        return os.path.join(database_dir, Constants.LLM_MEMO_DATABASE_NAME)
+
+    def create_table(self):
+        try:
+            self.connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS {Constants.LLM_MEMO_TABLE}
+                (
+                    key TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    response_metadata TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """)
+            self.connection.execute(f"""
+                CREATE INDEX IF NOT EXISTS {Constants.LLM_MEMO_TABLE}_last_used
+                ON {Constants.LLM_MEMO_TABLE} (last_used)
+                """)
+            self.connection.commit()
+        except sqlite3.Error as e:
+            print(f"{DATABASE_MESSAGE.DATABASE_LLM_MEMO_CREATE_TABLE_ERROR} {e}")
+
+    def make_key(self, messages):
+        values = {
+            'model': self.llm.model,
+            'format': self.llm.format,
+            'temperature': self.llm.temperature,
+            'messages': [(message.type, message.content) for message in messages],
+        }
+        return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode(UI.UTF_8)).hexdigest()
+
+    def invoke(self, messages):
+        key = self.make_key(messages)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT content, response_metadata FROM {Constants.LLM_MEMO_TABLE} WHERE key = ? AND created > ?",
+                (key, now - self.ttl)).fetchone()
+            if row is not None:
+                self.connection.execute(f"UPDATE {Constants.LLM_MEMO_TABLE} SET last_used = ? WHERE key = ?",
+                                        (now, key))
+                self.connection.commit()
+                self.hits += 1
+        if row is not None:
+            print(f"{MODEL_MESSAGE.LLM_MEMO_HIT} {self.llm.model}")
+            return AIMessage(content=row[0], response_metadata=json.loads(row[1]))
+
+        # The model is called outside the lock, concurrent graders do not wait for each other
+        result = self.llm.invoke(messages)
+        with self.lock:
+            self.misses += 1
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {Constants.LLM_MEMO_TABLE} "
+                f"(key, content, response_metadata, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, result.content, json.dumps(result.response_metadata, default=str), now, now))
+            self.evict(now)
+            self.connection.commit()
+        return result
+
+    def evict(self, now):
+        self.connection.execute(f"DELETE FROM {Constants.LLM_MEMO_TABLE} WHERE created <= ?", (now - self.ttl,))
+        self.connection.execute(
+            f"DELETE FROM {Constants.LLM_MEMO_TABLE} WHERE key IN "
+            f"(SELECT key FROM {Constants.LLM_MEMO_TABLE} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,))
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,74 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from util.Constants import Constants, MODEL_MESSAGE
+
+
+class WebSearchCache:
+    """
+    Web search results cached process-wide for a TTL, keyed by (backend, result count, normalized query).
+    Identical queries that run at the same time share one request, the later callers wait for the first one.
+    Wraps the search tool and is called the same way, invoke({"query": ...}).
+    """
+    __results = OrderedDict()
+    __in_flight = {}
+    __lock = threading.Lock()
+
+    def __init__(self, tool, backend, k, ttl=Constants.WEB_SEARCH_CACHE_TTL,
+                 max_entries=Constants.WEB_SEARCH_CACHE_MAX_ENTRIES):
+        self.tool = tool
+        self.backend = backend
+        self.k = k
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @staticmethod
+    def normalize_query(query):
+        return re.sub(r"\s+", " ", query).strip().casefold()
+
+    def invoke(self, tool_input):
+        key = (self.backend, self.k, self.normalize_query(tool_input["query"]))
+        cls = WebSearchCache
+        with cls.__lock:
+            entry = cls.__results.get(key)
+            if entry is not None and time.time() - entry['time'] < self.ttl:
+                cls.__results.move_to_end(key)
+                print(f"{MODEL_MESSAGE.WEB_SEARCH_CACHE_HIT} {tool_input['query']}")
+                return list(entry['results'])
+            future = cls.__in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                cls.__in_flight[key] = future
+
+        if not owner:
+            print(f"{MODEL_MESSAGE.WEB_SEARCH_COALESCED} {tool_input['query']}")
+            results = future.result()
+            return list(results) if isinstance(results, list) else results
+
+        try:
+            results = self.tool.invoke(tool_input)
+        except Exception as e:
+            with cls.__lock:
+                cls.__in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with cls.__lock:
+            # Failed searches come back as an error string, they are not cached
+            if isinstance(results, list):
+                cls.__results[key] = {'results': results, 'time': time.time()}
+                cls.__results.move_to_end(key)
+                while len(cls.__results) > self.max_entries:
+                    cls.__results.popitem(last=False)
+            cls.__in_flight.pop(key, None)
+        future.set_result(results)
+        return list(results) if isinstance(results, list) else results
+
+    @classmethod
+    def clear(cls):
+        with cls.__lock:
+            cls.__results.clear()